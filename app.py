@@ -3,16 +3,16 @@ from litestar.middleware.session.server_side import ServerSideSessionConfig
 from litestar.plugins.htmx import HTMXPlugin, HTMXTemplate, HTMXRequest
 from litestar.plugins.flash import FlashPlugin, FlashConfig, flash
 from litestar.contrib.jinja import JinjaTemplateEngine
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 from litestar.template.config import TemplateConfig
 from litestar.static_files import create_static_files_router
-from litestar.response import Template, Redirect
-from litestar.status_codes import HTTP_302_FOUND
+from litestar.response import Template, Redirect, Response
+from litestar.status_codes import HTTP_302_FOUND, HTTP_304_NOT_MODIFIED
 from litestar.exceptions import PermissionDeniedException
 from advanced_alchemy.extensions.litestar import filters, providers
-from advanced_alchemy.extensions.litestar.session import SQLAlchemyAsyncSessionBackend
 from config import settings
-from database import alchemy_plugin, alchemy_config
-from models import UserSessionModel, EventModel
+from database import alchemy_plugin, alchemy_config, CachedSQLAlchemySessionBackend
+from models import UserSessionModel
 from controllers.user_controller import UserController
 from controllers.event_controller import EventController
 from controllers.participant_controller import ParticipantController
@@ -22,6 +22,7 @@ from controllers.registration_controller import RegistrationController
 from services.event_service import EventService
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 # import logging
 
@@ -33,50 +34,77 @@ from zoneinfo import ZoneInfo
 from litestar.middleware.session.base import SessionMiddleware
 from litestar.middleware.base import DefineMiddleware
 
-# Create a minimal session config for the backend
-_temp_session_config = ServerSideSessionConfig(
+# Absolute project paths, independent of the current working directory
+BASE_DIR = Path(__file__).parent
+TEMPLATES_DIR = BASE_DIR / "templates"
+STATIC_DIR = BASE_DIR / "static"
+
+# Session configuration (cookie key, expiry)
+session_config = ServerSideSessionConfig(
     key=settings.secret_key,
     max_age=3600,
 )
 
-# Session backend using SQLAlchemy - stores sessions in user_sessions table
-session_backend = SQLAlchemyAsyncSessionBackend(
-    config=_temp_session_config,
+# Session backend using SQLAlchemy - stores sessions in user_sessions table,
+# with an in-process cache in front (SESSION_CACHE_TTL=0 disables it)
+session_backend = CachedSQLAlchemySessionBackend(
+    config=session_config,
     alchemy_config=alchemy_config,
     model=UserSessionModel,
+    ttl=settings.session_cache_ttl,
 )
 
-# Create session middleware with our SQLAlchemy backend
-# The middleware only needs the backend - other config is in the backend itself
-session_middleware = DefineMiddleware(
-    SessionMiddleware,
-    backend=session_backend,
-)
+# Session middleware bound to the single backend above.
+# session_config.middleware would build the default store-based backend, so it is defined explicitly.
+session_middleware = DefineMiddleware(SessionMiddleware, backend=session_backend)
 
 # Jinja2 filters
+_UTC = ZoneInfo("UTC")
+
+
+@lru_cache(maxsize=32)
+def _tz(name: str) -> ZoneInfo:
+    """Return the ZoneInfo for a timezone name, memoized across renders."""
+    return ZoneInfo(name)
+
+
 def to_local_time(dt: datetime, fmt: str = '%d/%m/%Y %H:%M', tz: str = "America/Sao_Paulo") -> str:
     """Convert UTC datetime to local timezone and format it."""
     if dt is None:
         return ""
     if dt.tzinfo is None:
         # Assume UTC if no timezone info
-        dt = dt.replace(tzinfo=ZoneInfo("UTC"))
-    local_dt = dt.astimezone(ZoneInfo(tz))
+        dt = dt.replace(tzinfo=_UTC)
+    local_dt = dt.astimezone(_tz(tz))
     return local_dt.strftime(fmt)
 
 
+# Compiled template bytecode is persisted here so workers skip the parse/compile step
+jinja_cache_dir = BASE_DIR / ".jinja_cache"
+jinja_cache_dir.mkdir(exist_ok=True)
+
+# Single Jinja2 environment shared by every render: templates are compiled once per process.
+# Outside debug mode templates are never re-stat'ed on disk.
+jinja_env = Environment(
+    loader=FileSystemLoader(searchpath=TEMPLATES_DIR),
+    autoescape=True,
+    auto_reload=settings.debug,
+    optimized=True,
+    cache_size=400,
+    bytecode_cache=FileSystemBytecodeCache(directory=str(jinja_cache_dir), pattern="%s.cache"),
+)
+jinja_env.filters["to_local_time"] = to_local_time
+
 # Create Jinja2 engine instance with custom filters
-jinja_engine = JinjaTemplateEngine(directory=Path("templates"))
-jinja_engine.engine.filters["to_local_time"] = to_local_time
+jinja_engine = JinjaTemplateEngine.from_environment(jinja_env)
 
 # Template Configuration
-template_config = TemplateConfig(
-    directory=Path("templates"),
-    engine=jinja_engine,
-)
+# Built once and shared by FlashConfig and the Litestar app so there is a single
+# Jinja environment (and a single compiled-template cache) per process.
+template_config = TemplateConfig(instance=jinja_engine)
 
 # Statics Files Configuration
-statics = create_static_files_router(path="/static", directories=[Path("static")])
+statics = create_static_files_router(path="/static", directories=[STATIC_DIR])
 
 # Flash Messages Configuration
 flash_config = FlashConfig(template_config=template_config)
@@ -85,24 +113,32 @@ flash_config = FlashConfig(template_config=template_config)
 index_dependencies = providers.create_service_dependencies(
     EventService,
     "events_service",
-    load=[EventModel.occurrences],
     filters={"pagination_type": "limit_offset"},
 )
 
 @get(path="/", name="index", dependencies=index_dependencies)
-async def index(request: HTMXRequest, events_service: EventService) -> Template:
+async def index(request: HTMXRequest, events_service: EventService) -> Template | Response:
     """Index Page"""
     # if request.htmx:
     #     print(request.htmx)  # HTMXDetails instance
     #     print(request.htmx.current_url)
 
-    data, total = await events_service.list_and_count(filters.LimitOffset(limit=10, offset=0))
+    # ETag fraco: usuário da sessão + última alteração + total de eventos
+    last_update, total = await events_service.fingerprint()
+    stamp = last_update.timestamp() if last_update else 0
+    etag = f'W/"{request.session.get("user_id")}-{total}-{stamp}"'
+    # Mensagens flash pendentes precisam ser renderizadas
+    if request.headers.get("if-none-match") == etag and not request.session.get("_messages"):
+        return Response(content=None, status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    # O total já veio do fingerprint (mesma transação): sem segundo COUNT
+    data = await events_service.list(filters.LimitOffset(limit=10, offset=0))
     context = {
         "events": data,
         "total": total,
         "has_events": total > 0
         }
-    return HTMXTemplate(template_name="event_list.html", context=context, push_url="/")
+    return HTMXTemplate(template_name="event_list.html", context=context, push_url="/", headers={"ETag": etag})
 
 
 # Exception Handlers
@@ -123,5 +159,5 @@ app = Litestar(
     template_config=template_config,
     request_class=HTMXRequest,
     exception_handlers={PermissionDeniedException: permission_denied_handler},
-    debug=True,  # Enable debug mode
+    debug=settings.debug,
 )
\ No newline at end of file
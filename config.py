@@ -1,14 +1,33 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 import secrets
 
 load_dotenv()
 
-@dataclass
+
+def _checkin_hmac_key() -> bytes:
+    """HMAC key for check-in codes; must be stable across restarts and workers, so there is no random fallback."""
+    key = os.getenv("CHECKIN_HMAC_KEY") or os.getenv("SECRET_KEY")
+    if not key:
+        raise RuntimeError(
+            "CHECKIN_HMAC_KEY (or SECRET_KEY) must be set: check-out codes are verified against "
+            "HMACs stored at check-in, so a per-process random key would reject them"
+        )
+    return key.encode()
+
+
+@dataclass(slots=True, frozen=True)
 class Settings:
-    database_url: str = os.getenv("DATABASE_URL")
-    secret_key: str = os.getenv("SECRET_KEY", secrets.token_urlsafe(32))
-    timezone: str = os.getenv("TZ", "America/Sao_Paulo")
+    database_url: str = field(default_factory=lambda: os.getenv("DATABASE_URL"))
+    secret_key: str = field(default_factory=lambda: os.getenv("SECRET_KEY") or secrets.token_urlsafe(32))
+    checkin_hmac_key: bytes = field(default_factory=_checkin_hmac_key)
+    timezone: str = field(default_factory=lambda: os.getenv("TZ", "America/Sao_Paulo"))
+    bcrypt_rounds: int = field(default_factory=lambda: int(os.getenv("BCRYPT_ROUNDS", "12")))
+    db_pool_size: int = field(default_factory=lambda: int(os.getenv("DB_POOL_SIZE") or (os.cpu_count() or 1) * 2))
+    db_max_overflow: int = field(default_factory=lambda: int(os.getenv("DB_MAX_OVERFLOW", "0")))
+    db_pool_pre_ping: bool = field(default_factory=lambda: os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes"))
+    session_cache_ttl: float = field(default_factory=lambda: float(os.getenv("SESSION_CACHE_TTL", "30")))
+    debug: bool = field(default_factory=lambda: os.getenv("DEBUG", "false").lower() in ("1", "true", "yes"))
 
 settings = Settings()
\ No newline at end of file
@@ -1,5 +1,6 @@
 from typing import Annotated
 
+import anyio
 from litestar import Controller, get, post
 from litestar.params import Body
 from litestar.di import Provide
@@ -8,14 +9,30 @@ from litestar.plugins.flash import flash
 from litestar.response import Template, Redirect
 from litestar.status_codes import HTTP_302_FOUND
 from advanced_alchemy.extensions.litestar import providers
+from sqlalchemy import select, bindparam
 from services.user_service import UserService
 from services.registration_service import RegistrationService
 from schemas import UserCreate
-from models import UserModel, RegistrationRequestModel
-from passlib.hash import bcrypt
+from models import UserModel, RegistrationRequestModel, pwd_context
 from datetime import datetime
 
 
+# Context-free form responses. Rendering happens per request (flash messages
+# come from the request), so a single instance can be returned every time.
+_LOGIN_TEMPLATE = HTMXTemplate(template_name="login.html")
+_REGISTER_TEMPLATE = HTMXTemplate(template_name="register.html")
+
+# Find user by username (backed by the uq_users_username index), fetching only
+# the columns the login flow needs. Built once; the engine caches its compiled form.
+_LOGIN_STMT = select(
+    UserModel.id,
+    UserModel.username,
+    UserModel.password_hash,
+    UserModel.is_active,
+    UserModel.profile,
+).where(UserModel.username == bindparam("username"))
+
+
 class AuthController(Controller):
     """Authentication endpoints"""
     
@@ -29,7 +46,7 @@ class AuthController(Controller):
     @get(path="/login")
     async def login_form(self) -> Template:
         """Render the login form."""
-        return HTMXTemplate(template_name="login.html")
+        return _LOGIN_TEMPLATE
 
 
     @post(path="/login")
@@ -46,19 +63,21 @@ class AuthController(Controller):
             
             if not username or not password:
                 flash(request, "Usuário e senha são obrigatórios", category="error")
-                return HTMXTemplate(template_name="login.html")
+                return _LOGIN_TEMPLATE
             
-            # Find user by username
-            users, _ = await users_service.list_and_count()
-            user = next((u for u in users if u.username == username), None)
+            # Read-only lookup: nothing pending needs flushing first
+            session = users_service.repository.session
+            with session.no_autoflush:
+                user = (await session.execute(_LOGIN_STMT, {"username": username})).first()
             
-            if not user or not bcrypt.verify(password, user.password_hash):
+            # bcrypt is deliberately slow; verify in a worker thread to keep the event loop free
+            if not user or not await anyio.to_thread.run_sync(pwd_context.verify, password, user.password_hash):
                 flash(request, "Usuário ou senha inválidos", category="error")
-                return HTMXTemplate(template_name="login.html")
+                return _LOGIN_TEMPLATE
             
             if not user.is_active:
                 flash(request, "Conta desativada. Entre em contato com o administrador.", category="error")
-                return HTMXTemplate(template_name="login.html")
+                return _LOGIN_TEMPLATE
             
             # Store user in session
             request.session["user_id"] = user.id
@@ -70,13 +89,13 @@ class AuthController(Controller):
             
         except Exception as e:
             flash(request, f"Erro no login: {str(e)}", category="error")
-            return HTMXTemplate(template_name="login.html")
+            return _LOGIN_TEMPLATE
 
 
     @get(path="/register")
     async def register_form(self) -> Template:
         """Render the registration form."""
-        return HTMXTemplate(template_name="register.html")
+        return _REGISTER_TEMPLATE
         
 
     @post(path="/register")
@@ -101,40 +120,38 @@ class AuthController(Controller):
             # Validation
             if not all([username, email, password, password_confirm]):
                 flash(request, "Todos os campos obrigatórios devem ser preenchidos", category="error")
-                return HTMXTemplate(template_name="register.html")
+                return _REGISTER_TEMPLATE
             
             if password != password_confirm:
                 flash(request, "As senhas não coincidem", category="error")
-                return HTMXTemplate(template_name="register.html")
+                return _REGISTER_TEMPLATE
             
             if len(password) < 6:
                 flash(request, "A senha deve ter pelo menos 6 caracteres", category="error")
-                return HTMXTemplate(template_name="register.html")
+                return _REGISTER_TEMPLATE
             
-            # Check if username or email already exists in users
-            users, _ = await users_service.list_and_count()
-            if any(u.username == username for u in users):
+            # Check if username or email already exists in users (one query for both)
+            existing_users = await users_service.find_existing(username, email)
+            if any(u.username == username for u in existing_users):
                 flash(request, "Nome de usuário já existe", category="error")
-                return HTMXTemplate(template_name="register.html")
+                return _REGISTER_TEMPLATE
             
-            if any(u.email == email for u in users):
+            if existing_users:
                 flash(request, "Email já está cadastrado", category="error")
-                return HTMXTemplate(template_name="register.html")
+                return _REGISTER_TEMPLATE
             
             # Check if username or email already has a pending registration request
-            registration_requests, _ = await registration_service.list_and_count()
-            pending_requests = [r for r in registration_requests if r.status == "pending"]
-
+            pending_requests = await registration_service.find_pending(username, email)
             if any(r.username == username for r in pending_requests):
                 flash(request, "Já existe uma solicitação de registro pendente com este nome de usuário", category="error")
-                return HTMXTemplate(template_name="register.html")
+                return _REGISTER_TEMPLATE
 
-            if any(r.email == email for r in pending_requests):
+            if pending_requests:
                 flash(request, "Já existe uma solicitação de registro pendente com este email", category="error")
-                return HTMXTemplate(template_name="register.html")
+                return _REGISTER_TEMPLATE
 
             # Check if there's a rejected registration request with the same email
-            rejected_with_email = next((r for r in registration_requests if r.status == "rejected" and r.email == email), None)
+            rejected_with_email = await registration_service.get_one_or_none(status="rejected", email=email)
             if rejected_with_email:
                 # Update the existing rejected request to pending
                 rejected_with_email.username = username
@@ -143,7 +160,7 @@ class AuthController(Controller):
                 rejected_with_email.status = "pending"
                 rejected_with_email.rejection_reason = None
                 rejected_with_email.requested_at = datetime.now()
-                rejected_with_email.set_password(password)
+                await rejected_with_email.set_password_async(password)
 
                 await registration_service.repository.session.commit()
                 await registration_service.repository.session.refresh(rejected_with_email)
@@ -159,8 +176,8 @@ class AuthController(Controller):
                 status="pending"
             )
             
-            # Set password using the model method
-            registration_request.set_password(password)
+            # Set password using the model method (hashed in a worker thread)
+            await registration_request.set_password_async(password)
             
             # Add to session and commit
             registration_service.repository.session.add(registration_request)
@@ -173,7 +190,7 @@ class AuthController(Controller):
             
         except Exception as e:
             flash(request, f"Erro ao criar solicitação de registro: {str(e)}", category="error")
-            return HTMXTemplate(template_name="register.html")
+            return _REGISTER_TEMPLATE
         
 
     @post(path="/logout")
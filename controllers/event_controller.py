@@ -1,7 +1,9 @@
+import re
 from typing import Annotated
 from datetime import datetime, date
 from zoneinfo import ZoneInfo
 
+import msgspec
 from litestar import Controller, get, post, patch, delete, Request
 from litestar.params import Dependency, Parameter, Body
 from litestar.response import Template
@@ -9,20 +11,103 @@ from litestar.status_codes import HTTP_200_OK
 from litestar.plugins.htmx import HTMXTemplate, HTMXRequest
 from litestar.plugins.flash import flash
 from advanced_alchemy.extensions.litestar import filters, providers, service
+from sqlalchemy.orm import noload
 from services.event_service import EventService
 from schemas import EventRead, EventCreate, EventUpdate
 from models import EventModel
-from middleware import require_profiles
+from middleware import admin_organizer_guard
 from config import settings
 
 
+# Schema type for the event list, bound once at import instead of per request
+_EVENT_READ_LIST = list[EventRead]
+
+# Only the flash messages, swapped out-of-band; the request target gets an empty body
+_FLASH_OOB_TEMPLATE = HTMXTemplate(template_name="flash_messages.html", context={"oob": True})
+# Same, but leaves the request target untouched (failed writes: nothing changed on screen)
+_FLASH_ERROR_TEMPLATE = HTMXTemplate(template_name="flash_messages.html", context={"oob": True}, re_swap="none")
+
+
+# Checkbox values accepted as true
+_TRUTHY: frozenset = frozenset(("on", "true", True))
+
+# Separador das listas digitadas no formulário ("0, 2,4")
+_CSV_SPLIT = re.compile(r"\s*,\s*")
+
+# Fuso local do formulário e UTC do armazenamento, resolvidos uma vez
+_TZ_LOCAL = ZoneInfo(settings.timezone)
+_TZ_UTC = ZoneInfo("UTC")
+
+_EVENT_DATETIME_FIELDS = ("single_start", "single_end")
+_EVENT_DATE_FIELDS = ("recurrence_start_date", "recurrence_end_date")
+
+
+def _parse_event_form(form_data) -> dict:
+    """Convert the event form data into EventCreate/EventUpdate keyword arguments."""
+    form_dict = {
+        "name": form_data.get("name", ""),
+        "description": form_data.get("description", ""),
+        # Handle checkbox - convert "on" or "true" to boolean
+        "is_recurring": form_data.get("is_recurring") in _TRUTHY,
+    }
+
+    # Datetimes of single events: parse as local time and convert to UTC for storage
+    for field in _EVENT_DATETIME_FIELDS:
+        value = form_data.get(field)
+        if value:
+            local_dt = datetime.fromisoformat(value)
+            if local_dt.tzinfo is None:
+                # Assume local timezone if naive
+                local_dt = local_dt.replace(tzinfo=_TZ_LOCAL)
+            form_dict[field] = local_dt.astimezone(_TZ_UTC)
+
+    # Dates of recurring events
+    for field in _EVENT_DATE_FIELDS:
+        value = form_data.get(field)
+        if value:
+            form_dict[field] = date.fromisoformat(value)
+
+    # Recurrence rule: comma-separated weekdays and HH:MM-HH:MM time windows
+    recurrence_rule = {}
+    weekdays_str = form_data.get("recurrence_rule.weekdays")
+    if weekdays_str:
+        recurrence_rule["weekdays"] = [day for day in _CSV_SPLIT.split(weekdays_str.strip()) if day]
+
+    time_windows_str = form_data.get("recurrence_rule.time_windows")
+    if time_windows_str:
+        recurrence_rule["time_windows"] = [window for window in _CSV_SPLIT.split(time_windows_str.strip()) if window]
+
+    form_dict["recurrence_rule"] = recurrence_rule
+    return form_dict
+
+
+async def _event_list_template(
+    events_service: EventService,
+    filters: list[filters.FilterTypes],
+) -> Template:
+    """Render the event list page for the given filters."""
+    results, total = await events_service.list_and_count(*filters)
+    events = msgspec.convert(results, type=_EVENT_READ_LIST, from_attributes=True)
+
+    context = {
+        "events": events,
+        "total": total,
+        "has_events": len(events) > 0
+    }
+    return HTMXTemplate(template_name="event_list.html", context=context)
+
+
 class EventController(Controller):
     """Event CRUD endpoints"""
 
+    # Formulários pequenos: limita o corpo bufferizado por request.form()
+    request_max_body_size = 64 * 1024
+
     dependencies = providers.create_service_dependencies(
         EventService,
         "events_service",
-        load=[EventModel.occurrences],
+        # Templates de eventos não exibem ocorrências; evita o selectin padrão do modelo
+        load=[noload(EventModel.occurrences)],
         filters={"pagination_type": "limit_offset", "id_filter": int, "search": "name", "search_ignore_case": True},
     )
 
@@ -35,97 +120,27 @@ class EventController(Controller):
         filters: Annotated[list[filters.FilterTypes], Dependency(skip_validation=True)],
     ) -> Template:
         """List all events with pagination."""
-        results, total = await events_service.list_and_count(*filters)
-        events_data = events_service.to_schema(results, total, filters=filters, schema_type=EventRead)
-        
-        context = {
-            "events": events_data.items,
-            "total": events_data.total,
-            "has_events": len(events_data.items) > 0
-        }
-        
-        # if request.htmx:
-        #     return HTMXTemplate(template_name="event_list_content.html", context=context)
-        return HTMXTemplate(template_name="event_list.html", context=context)
+        return await _event_list_template(events_service, filters)
     
 
-    @get(path="/events/new")
+    @get(path="/events/new", guards=[admin_organizer_guard])
     async def new_event_form(self, request: Request) -> Template:
         """Render the event creation form."""
-        require_profiles(request, ["admin", "organizer"])
         return HTMXTemplate(template_name="event_form.html")
     
 
-    @post(path="/events")
+    @post(path="/events", guards=[admin_organizer_guard])
     async def create_event(
         self,
         request: HTMXRequest,
         events_service: EventService,
+        filters: Annotated[list[filters.FilterTypes], Dependency(skip_validation=True)],
     ) -> Template:
         """Create a new event."""
-        require_profiles(request, ["admin", "organizer"])
         try:
-            # Get form data from request
-            form_data = await request.form()
-            
             # Convert form data to EventCreate schema
-            form_dict = {}
-            
-            # Basic fields
-            form_dict["name"] = form_data.get("name", "")
-            form_dict["description"] = form_data.get("description", "")
-            
-            # Handle checkbox - convert "on" or "true" to boolean
-            is_recurring_value = form_data.get("is_recurring")
-            form_dict["is_recurring"] = is_recurring_value in ["on", "true", True]
-            
-            # Handle datetime fields for single events
-            single_start = form_data.get("single_start")
-            if single_start:
-                # Parse as local time and convert to UTC for storage
-                local_dt = datetime.fromisoformat(single_start)
-                if local_dt.tzinfo is None:
-                    # Assume local timezone if naive
-                    local_dt = local_dt.replace(tzinfo=ZoneInfo(settings.timezone))
-                utc_dt = local_dt.astimezone(ZoneInfo("UTC"))
-                form_dict["single_start"] = utc_dt
-
-            single_end = form_data.get("single_end")
-            if single_end:
-                # Parse as local time and convert to UTC for storage
-                local_dt = datetime.fromisoformat(single_end)
-                if local_dt.tzinfo is None:
-                    # Assume local timezone if naive
-                    local_dt = local_dt.replace(tzinfo=ZoneInfo(settings.timezone))
-                utc_dt = local_dt.astimezone(ZoneInfo("UTC"))
-                form_dict["single_end"] = utc_dt
-                
-            # Handle date fields for recurring events
-            recurrence_start_date = form_data.get("recurrence_start_date")
-            if recurrence_start_date:
-                form_dict["recurrence_start_date"] = date.fromisoformat(recurrence_start_date)
-            
-            recurrence_end_date = form_data.get("recurrence_end_date")
-            if recurrence_end_date:
-                form_dict["recurrence_end_date"] = date.fromisoformat(recurrence_end_date)
-                
-            # Handle recurrence rule
-            recurrence_rule = {}
-            if form_data.get("recurrence_rule.weekdays"):
-                # Parse weekdays (comma-separated string to list)
-                weekdays_str = form_data.get("recurrence_rule.weekdays", "")
-                weekdays = [day.strip() for day in weekdays_str.split(",") if day.strip()]
-                recurrence_rule["weekdays"] = weekdays
-                
-            if form_data.get("recurrence_rule.time_windows"):
-                # Parse time windows (comma-separated HH:MM-HH:MM format)
-                time_windows_str = form_data.get("recurrence_rule.time_windows", "")
-                time_windows = [window.strip() for window in time_windows_str.split(",") if window.strip()]
-                recurrence_rule["time_windows"] = time_windows
-                
-            form_dict["recurrence_rule"] = recurrence_rule
-            form_dict["occurrences"] = []  # Empty list as default
-            
+            form_dict = _parse_event_form(await request.form())
+
             # Create EventCreate instance
             event_data = EventCreate(**form_dict)
             
@@ -137,27 +152,18 @@ class EventController(Controller):
             # Flash success message
             flash(request, "Evento criado com sucesso!", category="success")
             
-            # Return updated event list
-            results, total = await events_service.list_and_count()
-            events_data = events_service.to_schema(results, total, schema_type=EventRead)
-            
-            context = {
-                "events": events_data.items,
-                "total": events_data.total,
-                "has_events": len(events_data.items) > 0
-            }
-            
-            return HTMXTemplate(template_name="event_list.html", context=context)
+            # Return the first page of the event list
+            return await _event_list_template(events_service, filters)
             
         except Exception as e:
             # Flash error message
             flash(request, f"Erro ao criar evento: {str(e)}", category="error")
             
-            # Return the form with error
-            return HTMXTemplate(template_name="event_form.html")
+            # Keep the filled-in form on screen and only show the error
+            return _FLASH_ERROR_TEMPLATE
     
 
-    @get(path="/events/{event_id:int}/edit")
+    @get(path="/events/{event_id:int}/edit", guards=[admin_organizer_guard])
     async def edit_event_form(
         self,
         request: Request,
@@ -168,7 +174,6 @@ class EventController(Controller):
         ),
     ) -> Template:
         """Render the event edit form."""
-        require_profiles(request, ["admin", "organizer"])
         event = await events_service.get(event_id)
         context = {
             "event": event
@@ -176,83 +181,28 @@ class EventController(Controller):
         return HTMXTemplate(template_name="event_form.html", context=context)
     
 
-    @patch(path="/events/{event_id:int}")
+    @patch(path="/events/{event_id:int}", guards=[admin_organizer_guard])
     async def update_event(
         self,
         request: HTMXRequest,
         events_service: EventService,
+        filters: Annotated[list[filters.FilterTypes], Dependency(skip_validation=True)],
         event_id: int = Parameter(
             title="Event ID",
             description="The event to update.",
         ),
     ) -> Template:
         """Update an event."""
-        require_profiles(request, ["admin", "organizer"])
         try:
-            # Get form data from request
-            form_data = await request.form()
-
             # Convert form data to EventUpdate schema
-            form_dict = {}
-
-            # Basic fields
-            form_dict["name"] = form_data.get("name", "")
-            form_dict["description"] = form_data.get("description", "")
-
-            # Handle checkbox - convert "on" or "true" to boolean
-            is_recurring_value = form_data.get("is_recurring")
-            form_dict["is_recurring"] = is_recurring_value in ["on", "true", True]
-
-            # Handle datetime fields for single events
-            single_start = form_data.get("single_start")
-            if single_start:
-                # Parse as local time and convert to UTC for storage
-                local_dt = datetime.fromisoformat(single_start)
-                if local_dt.tzinfo is None:
-                    # Assume local timezone if naive
-                    local_dt = local_dt.replace(tzinfo=ZoneInfo(settings.timezone))
-                utc_dt = local_dt.astimezone(ZoneInfo("UTC"))
-                form_dict["single_start"] = utc_dt
-
-            single_end = form_data.get("single_end")
-            if single_end:
-                # Parse as local time and convert to UTC for storage
-                local_dt = datetime.fromisoformat(single_end)
-                if local_dt.tzinfo is None:
-                    # Assume local timezone if naive
-                    local_dt = local_dt.replace(tzinfo=ZoneInfo(settings.timezone))
-                utc_dt = local_dt.astimezone(ZoneInfo("UTC"))
-                form_dict["single_end"] = utc_dt
-
-            # Handle date fields for recurring events
-            recurrence_start_date = form_data.get("recurrence_start_date")
-            if recurrence_start_date:
-                form_dict["recurrence_start_date"] = date.fromisoformat(recurrence_start_date)
-
-            recurrence_end_date = form_data.get("recurrence_end_date")
-            if recurrence_end_date:
-                form_dict["recurrence_end_date"] = date.fromisoformat(recurrence_end_date)
-
-            # Handle recurrence rule
-            recurrence_rule = {}
-            if form_data.get("recurrence_rule.weekdays"):
-                # Parse weekdays (comma-separated string to list)
-                weekdays_str = form_data.get("recurrence_rule.weekdays", "")
-                weekdays = [day.strip() for day in weekdays_str.split(",") if day.strip()]
-                recurrence_rule["weekdays"] = weekdays
-
-            if form_data.get("recurrence_rule.time_windows"):
-                # Parse time windows (comma-separated HH:MM-HH:MM format)
-                time_windows_str = form_data.get("recurrence_rule.time_windows", "")
-                time_windows = [window.strip() for window in time_windows_str.split(",") if window.strip()]
-                recurrence_rule["time_windows"] = time_windows
-
-            form_dict["recurrence_rule"] = recurrence_rule
+            form_dict = _parse_event_form(await request.form())
 
             # Create EventUpdate instance
             event_data = EventUpdate(**form_dict)
 
-            obj = await events_service.update(event_data, item_id=event_id, auto_commit=True)
+            # Dict + item_id: only these columns are set on the loaded event, so its occurrences
+            # collection is not replaced (merging a new instance would orphan-delete them)
+            obj = await events_service.update(event_data.to_dict(), item_id=event_id, auto_commit=True)
 
             # Regenerate occurrences for the updated event
             await events_service.generate_occurrences(obj, events_service.repository.session)
@@ -260,29 +210,18 @@ class EventController(Controller):
             # Flash success message
             flash(request, "Evento atualizado com sucesso!", category="success")
 
-            # Return updated event list
-            results, total = await events_service.list_and_count()
-            events_data = events_service.to_schema(results, total, schema_type=EventRead)
-
-            context = {
-                "events": events_data.items,
-                "total": events_data.total,
-                "has_events": len(events_data.items) > 0
-            }
-
-            return HTMXTemplate(template_name="event_list.html", context=context)
+            # Return the first page of the event list
+            return await _event_list_template(events_service, filters)
 
         except Exception as e:
             # Flash error message
             flash(request, f"Erro ao atualizar evento: {str(e)}", category="error")
 
-            # Return the form with error
-            event = await events_service.get(event_id)
-            context = {"event": event}
-            return HTMXTemplate(template_name="event_form.html", context=context)
+            # Keep the filled-in form on screen and only show the error
+            return _FLASH_ERROR_TEMPLATE
     
 
-    @delete(path="/events/{event_id:int}", status_code=HTTP_200_OK)
+    @delete(path="/events/{event_id:int}", status_code=HTTP_200_OK, guards=[admin_organizer_guard])
     async def delete_event(
         self,
         request: HTMXRequest,
@@ -293,37 +232,18 @@ class EventController(Controller):
         ),
     ) -> Template:
         """Delete an event from the system."""
-        require_profiles(request, ["admin", "organizer"])
         try:
             await events_service.delete(event_id)
             
             # Flash success message
             flash(request, "Evento excluído com sucesso!", category="success")
             
-            # Return updated event list
-            results, total = await events_service.list_and_count()
-            events_data = events_service.to_schema(results, total, schema_type=EventRead)
-            
-            context = {
-                "events": events_data.items,
-                "total": events_data.total,
-                "has_events": len(events_data.items) > 0
-            }
-            
-            return HTMXTemplate(template_name="event_list.html", context=context)
+            # The card (hx-target) is replaced by nothing; only the flash message is swapped in
+            return _FLASH_OOB_TEMPLATE
             
         except Exception as e:
             # Flash error message
             flash(request, f"Erro ao excluir evento: {str(e)}", category="error")
             
-            # Return current event list
-            results, total = await events_service.list_and_count()
-            events_data = events_service.to_schema(results, total, schema_type=EventRead)
-            
-            context = {
-                "events": events_data.items,
-                "total": events_data.total,
-                "has_events": len(events_data.items) > 0
-            }
-            
-            return HTMXTemplate(template_name="event_list.html", context=context)
\ No newline at end of file
+            # Keep the card in place and only show the error
+            return _FLASH_ERROR_TEMPLATE
\ No newline at end of file
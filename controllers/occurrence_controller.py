@@ -1,7 +1,11 @@
-from typing import Annotated
+from typing import Iterator, NamedTuple, Sequence
+from dataclasses import dataclass
 import secrets
 import hashlib
-from datetime import datetime, timedelta
+import hmac
+import time
+from itertools import product
+from datetime import date, datetime
 from zoneinfo import ZoneInfo
 
 from litestar import Controller, get, post, Request
@@ -10,23 +14,101 @@ from litestar.plugins.htmx import HTMXRequest, HTMXTemplate
 from litestar.plugins.flash import flash
 from litestar.response import Template
 from advanced_alchemy.extensions.litestar import providers
+from sqlalchemy import asc
+from sqlalchemy.orm import joinedload, noload
 from services.occurrence_service import OccurrenceService
 from services.attendance_service import AttendanceService
 from services.participant_service import ParticipantService
-from models import EventOccurrenceModel, AttendanceModel, ParticipantModel
-from middleware import require_profiles
+from models import EventModel, EventOccurrenceModel, AttendanceModel, ParticipantModel
+from middleware import checkin_checkout_guard
 from config import settings
 
 
+# Mensagens de erro do check-in/check-out
+_ERR_PARTICIPANT_REQUIRED = "ID do participante é obrigatório"
+_ERR_CHECKOUT_BY_REQUIRED = "ID do responsável pelo check-out é obrigatório"
+_ERR_CODE_REQUIRED = "Código é obrigatório para menores de idade."
+_ERR_CODE_INVALID = "Código inválido."
+
+# Only the flash messages, swapped out-of-band, leaving the request target untouched
+_FLASH_ERROR_TEMPLATE = HTMXTemplate(template_name="flash_messages.html", context={"oob": True}, re_swap="none")
+
+
+# Código da criança: 6 caracteres sem símbolos ambíguos (0/O, 1/I/L, U)
+_CODE_ALPHABET = "ABCDEFGHJKMNPQRSTVWXYZ23456789"
+_CODE_LENGTH = 6
+# Check-ins anteriores ao HMAC têm código hexadecimal (pode conter 0 e 1) e hash SHA-256 simples
+_CODE_INPUT_CHARS = frozenset(_CODE_ALPHABET + "01")
+
+
+_UTC = ZoneInfo("UTC")
+
+
+def _status_branch(before_open: bool, after_end: bool, checkin_available: bool, checkout_available: bool) -> tuple[str, str]:
+    """Get (status_text, status) for one combination of the window flags."""
+    if before_open:
+        return "Check-in abre em breve", "event_not_started"
+    if after_end:
+        return "Evento finalizado", "event_ended"
+    if checkin_available:
+        return "Check-in disponível", "checkin_available"
+    if checkout_available:
+        return "Check-out disponível", "checkout_available"
+    return "Check-in fechado", "checkin_closed"
+
+
+# (antes da abertura, após o fim, check-in disponível, check-out disponível) -> (status_text, status)
+_STATUS_TABLE: dict[tuple[bool, bool, bool, bool], tuple[str, str]] = {
+    flags: _status_branch(*flags) for flags in product((False, True), repeat=4)
+}
+
+
+def _compute_status(
+    start_ts: int, end_ts: int, checkin_opens: int, checkin_closes: int, now_ts: int
+) -> tuple[str, str, bool, bool]:
+    """Get (status_text, status, checkin_available, checkout_available) from UNIX timestamps."""
+    checkin_available = checkin_opens <= now_ts <= checkin_closes
+    checkout_available = start_ts <= now_ts <= end_ts
+    status_text, status = _STATUS_TABLE[(now_ts < checkin_opens, now_ts > end_ts, checkin_available, checkout_available)]
+    return status_text, status, checkin_available, checkout_available
+
+
+class _Window(NamedTuple):
+    """Opening and closing time of a check-in or check-out window."""
+    open: datetime
+    close: datetime
+
+
+@dataclass(slots=True)
+class OccurrenceWithStatus:
+    """Occurrence row of the check-in/check-out selection page."""
+    id: int
+    event: EventModel
+    start_at: datetime
+    end_at: datetime
+    status: str
+    can_checkin: bool
+    can_checkout: bool
+    checkin_window: _Window | None
+    checkout_window: _Window | None
+
+
 class OccurrenceController(Controller):
     """Event Occurrence and Check-in/Check-out endpoints"""
     
     path = "/occurrences"
+    guards = [checkin_checkout_guard]
+    # Formulários de check-in/check-out têm poucos campos: limita o corpo bufferizado
+    request_max_body_size = 16 * 1024
     
     occurrences_dep = providers.create_service_dependencies(
         OccurrenceService,
         "occurrences_service",
-        load=[EventOccurrenceModel.event]
+        # Só o evento é usado: evita carregar (selectin) as presenças e as demais ocorrências do evento
+        load=[
+            joinedload(EventOccurrenceModel.event).noload(EventModel.occurrences),
+            noload(EventOccurrenceModel.attendances),
+        ]
     )
     attendance_dep = providers.create_service_dependencies(
         AttendanceService,
@@ -42,59 +124,58 @@ class OccurrenceController(Controller):
     dependencies = {**occurrences_dep, **attendance_dep, **participants_dep}
 
 
-    async def _get_base_context(self, occurrence_id: int, occurrences_service: OccurrenceService, participants_service: ParticipantService) -> dict:
-        """Get base context for forms."""
+    async def _get_base_context(
+        self,
+        occurrence_id: int,
+        occurrences_service: OccurrenceService,
+        participants_service: ParticipantService,
+        with_participants: bool = True,
+    ) -> dict:
+        """Get base context for forms.
+
+        The check-in page searches participants instead of listing them, and a closed
+        check-out window renders no form: pass ``with_participants=False`` to skip the list.
+        """
         occurrence = await occurrences_service.get(occurrence_id)
-        participants, _ = await participants_service.list_and_count()
+        participants = await participants_service.list_cached() if with_participants else []
         return {
             "occurrence": occurrence,
             "participants": participants,
         }
     
 
-    def _is_checkin_available(self, occurrence: EventOccurrenceModel) -> bool:
+    def _is_checkin_available(self, occurrence: EventOccurrenceModel, now_ts: int | None = None) -> bool:
         """Check if check-in window is open for this occurrence.
 
         Check-in opens 2 hours before event starts and closes 40 minutes before event ends.
+        ``now_ts`` is the current UNIX timestamp (read from the clock if not given).
         """
-        # Get current time in the same timezone as the event
-        if occurrence.start_at.tzinfo:
-            now = datetime.now(occurrence.start_at.tzinfo)
-        else:
-            # If no timezone info, assume UTC and convert to local timezone
-            now = datetime.now(ZoneInfo("UTC")).astimezone(ZoneInfo(settings.timezone))
-
-        # Check-in opens 2 hours before start
-        checkin_open = occurrence.start_at - timedelta(hours=2)
-        # Check-in closes 40 minutes before end
-        checkin_close = occurrence.end_at - timedelta(minutes=40)
+        if now_ts is None:
+            now_ts = int(time.time())
 
-        return checkin_open <= now <= checkin_close
+        # Window stored on the occurrence when it was created
+        return int(occurrence.checkin_opens_at.timestamp()) <= now_ts <= int(occurrence.checkin_closes_at.timestamp())
     
 
-    def _is_checkout_available(self, occurrence: EventOccurrenceModel) -> bool:
+    def _is_checkout_available(self, occurrence: EventOccurrenceModel, now_ts: int | None = None) -> bool:
         """Check if check-out window is open for this occurrence.
 
         Check-out can only be done after event starts and before it ends.
+        ``now_ts`` is the current UNIX timestamp (read from the clock if not given).
         """
-        # Get current time in the same timezone as the event
-        if occurrence.start_at.tzinfo:
-            now = datetime.now(occurrence.start_at.tzinfo)
-        else:
-            # If no timezone info, assume UTC and convert to local timezone
-            now = datetime.now(ZoneInfo("UTC")).astimezone(ZoneInfo(settings.timezone))
+        if now_ts is None:
+            now_ts = int(time.time())
 
-        # Check-out opens when event starts
-        checkout_open = occurrence.start_at
-        # Check-out closes when event ends
-        checkout_close = occurrence.end_at
-
-        return checkout_open <= now <= checkout_close
+        # Check-out opens when event starts and closes when event ends
+        return int(occurrence.start_at.timestamp()) <= now_ts <= int(occurrence.end_at.timestamp())
     
 
-    def _get_occurrence_status(self, occurrence: EventOccurrenceModel) -> dict:
+    def _get_occurrence_status(self, occurrence: EventOccurrenceModel, now_ts: int | None = None) -> dict:
         """Get current status of occurrence for check-in/check-out.
 
+        ``now_ts`` is the current UNIX timestamp, the same one the window checks use; pass it
+        when computing the status of many occurrences so they share one clock read.
+
         Returns dict with:
         - checkin_available: bool
         - checkout_available: bool
@@ -105,50 +186,47 @@ class OccurrenceController(Controller):
         - status_text: str (human-readable status)
         - status: str (CSS class status)
         """
-        checkin_opens = occurrence.start_at - timedelta(hours=2)
-        checkin_closes = occurrence.end_at - timedelta(minutes=40)
-        checkout_opens = occurrence.start_at
-        checkout_closes = occurrence.end_at
-
-        # Get current time in the same timezone as the event
-        if occurrence.start_at.tzinfo:
-            now = datetime.now(occurrence.start_at.tzinfo)
-        else:
-            # If no timezone info, assume UTC and convert to local timezone
-            now = datetime.now(ZoneInfo("UTC")).astimezone(ZoneInfo(settings.timezone))
-
-        checkin_available = self._is_checkin_available(occurrence)
-        checkout_available = self._is_checkout_available(occurrence)
-
-        # Determine status text and CSS class
-        if now < checkin_opens:
-            status_text = "Check-in abre em breve"
-            status = "event_not_started"
-        elif now > checkout_closes:
-            status_text = "Evento finalizado"
-            status = "event_ended"
-        elif checkin_available:
-            status_text = "Check-in disponível"
-            status = "checkin_available"
-        elif checkout_available:
-            status_text = "Check-out disponível"
-            status = "checkout_available"
-        else:
-            status_text = "Check-in fechado"
-            status = "checkin_closed"
+        if now_ts is None:
+            now_ts = int(time.time())
+        status_text, status, checkin_available, checkout_available = _compute_status(
+            int(occurrence.start_at.timestamp()),
+            int(occurrence.end_at.timestamp()),
+            int(occurrence.checkin_opens_at.timestamp()),
+            int(occurrence.checkin_closes_at.timestamp()),
+            now_ts,
+        )
 
         return {
             "checkin_available": checkin_available,
             "checkout_available": checkout_available,
-            "checkin_opens_at": checkin_opens,
-            "checkin_closes_at": checkin_closes,
-            "checkout_opens_at": checkout_opens,
-            "checkout_closes_at": checkout_closes,
+            "checkin_opens_at": occurrence.checkin_opens_at,
+            "checkin_closes_at": occurrence.checkin_closes_at,
+            "checkout_opens_at": occurrence.start_at,
+            "checkout_closes_at": occurrence.end_at,
             "status_text": status_text,
             "status": status,
         }
 
 
+    def _iter_with_status(
+        self, occurrences: Sequence[EventOccurrenceModel], now_ts: int
+    ) -> Iterator[OccurrenceWithStatus]:
+        """Yield each occurrence wrapped with its status, without building the whole list."""
+        for occurrence in occurrences:
+            status = self._get_occurrence_status(occurrence, now_ts)
+            yield OccurrenceWithStatus(
+                id=occurrence.id,
+                event=occurrence.event,
+                start_at=occurrence.start_at,
+                end_at=occurrence.end_at,
+                status=status['status'],
+                can_checkin=status['checkin_available'],
+                can_checkout=status['checkout_available'],
+                checkin_window=_Window(status['checkin_opens_at'], status['checkin_closes_at']),
+                checkout_window=_Window(status['checkout_opens_at'], status['checkout_closes_at']),
+            )
+
+
     @get(path="/checkin-checkout")
     async def list_occurrences_for_checkin_checkout(
         self,
@@ -156,40 +234,15 @@ class OccurrenceController(Controller):
         occurrences_service: OccurrenceService,
     ) -> Template:
         """List all occurrences with check-in/check-out availability status."""
-        require_profiles(request, ["admin", "organizer", "volunteer"])
         
         try:
             # Sort occurrences by start_at descending (most recent first)
-            from sqlalchemy import asc
-            occurrences, _ = await occurrences_service.list_and_count(order_by=[asc(EventOccurrenceModel.start_at)])
+            occurrences = await occurrences_service.list(order_by=[asc(EventOccurrenceModel.start_at)])
             
-            # Add status information to each occurrence
-            occurrences_with_status = []
-            for occurrence in occurrences:
-                status = self._get_occurrence_status(occurrence)
-                # Create a dynamic object with status attributes
-                occurrence_with_status = type('OccurrenceWithStatus', (), {
-                    'id': occurrence.id,
-                    'event': occurrence.event,
-                    'start_at': occurrence.start_at,
-                    'end_at': occurrence.end_at,
-                    'status': status['status'],
-                    'can_checkin': status['checkin_available'],
-                    'can_checkout': status['checkout_available'],
-                    'checkin_window': {
-                        'open': status['checkin_opens_at'],
-                        'close': status['checkin_closes_at']
-                    } if status['checkin_opens_at'] and status['checkin_closes_at'] else None,
-                    'checkout_window': {
-                        'open': status['checkout_opens_at'],
-                        'close': status['checkout_closes_at']
-                    } if status['checkout_opens_at'] and status['checkout_closes_at'] else None,
-                })()
-                occurrences_with_status.append(occurrence_with_status)
-
+            # Status is computed lazily while the template iterates (one clock read for the whole list)
             context = {
-                "occurrences": occurrences_with_status,
-                "has_occurrences": len(occurrences_with_status) > 0
+                "occurrences": self._iter_with_status(occurrences, int(time.time())),
+                "has_occurrences": len(occurrences) > 0
             }
             
             return HTMXTemplate(template_name="checkin_checkout_selection.html", context=context)
@@ -215,15 +268,16 @@ class OccurrenceController(Controller):
         ),
     ) -> Template:
         """Render the check-in form."""
-        require_profiles(request, ["admin", "organizer", "volunteer"])
         
         try:
-            base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service)
+            base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service, with_participants=False)
             occurrence = base_context["occurrence"]
             
             # Check if check-in is available
-            if not self._is_checkin_available(occurrence):
-                status = self._get_occurrence_status(occurrence)
+            now = datetime.now(_UTC)
+            now_ts = int(now.timestamp())
+            if not self._is_checkin_available(occurrence, now_ts):
+                status = self._get_occurrence_status(occurrence, now_ts)
                 context = {
                     **base_context,
                     "checkin_ok": False,
@@ -266,45 +320,33 @@ class OccurrenceController(Controller):
         search: str = "",
     ) -> Template:
         """Search participants by name or phone digits."""
-
-        require_profiles(request, ["admin", "organizer", "volunteer"])
-
-        base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service)
-        occurrence = base_context["occurrence"]
+        occurrence = await occurrences_service.get(occurrence_id)
         if not occurrence:
             return Template("checkin_search_result.html", context={
                 "participants": [],
                 "search_query": search,
             })
 
-        # Get all participants
+        # Search by name or last 4 phone digits
+        checked_in_ids = set()
         if search and len(search) >= 2:
-            # Search by name or last 4 phone digits
-            search_lower = search.lower()
+            filtered = await participants_service.search(search)
 
-            participants_list = base_context["participants"]
-
-            # Filter by name or phone
-            filtered = [
-                p for p in participants_list
-                if (search_lower in p.full_name.lower() or
-                    (p.phone and search in p.phone[-4:]))
-            ]
-
-            # Check which ones already did checkin
-            from datetime import date
-
-            for participant in filtered:
-                existing_attendance = await attendance_service.get_by_occurrence_and_participant(occurrence_id, participant.id)
-                participant.already_checked_in = existing_attendance is not None
-                participant.is_adult = participant.age_on(date.today()) >= 18
+            # Check which ones already did checkin (single query)
+            attendances = await attendance_service.list_by_occurrence_and_participants(
+                occurrence_id, [participant.id for participant in filtered]
+            )
+            checked_in_ids = set(attendances)
         else:
             filtered = []
 
+        # Cached instances are shared between requests: per-request flags go in the context
         return Template("checkin_search_result.html", context={
             "participants": filtered,
             "search_query": search,
             "occurrence": occurrence,
+            "checked_in_ids": checked_in_ids,
+            "today": date.today(),
         })
 
 
@@ -321,77 +363,57 @@ class OccurrenceController(Controller):
         ),
     ) -> Template:
         """Process check-in."""
-        require_profiles(request, ["admin", "organizer", "volunteer"])
         try:
             form_data = await request.form()
             participant_id_str = form_data.get("participant_id")
             if not participant_id_str:
-                flash(request, "ID do participante é obrigatório", category="error")
-                base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service)
+                flash(request, _ERR_PARTICIPANT_REQUIRED, category="error")
+                base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service, with_participants=False)
                 context = {
                     **base_context,
                     "checkin_ok": False,
-                    "error": "ID do participante é obrigatório",
+                    "error": _ERR_PARTICIPANT_REQUIRED,
                     "code": None
                 }
                 return HTMXTemplate(template_name="checkin.html", context=context)
             participant_id = int(participant_id_str)
 
-            occurrence = await occurrences_service.get(occurrence_id)
+            # Occurrence is loaded once and shared by every response below
+            base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service, with_participants=False)
+            occurrence = base_context["occurrence"]
             
             # Validate check-in window
-            if not self._is_checkin_available(occurrence):
-                status = self._get_occurrence_status(occurrence)
-                participant = await participants_service.get(participant_id)
-                participants, _ = await participants_service.list_and_count()
+            now = datetime.now(_UTC)
+            now_ts = int(now.timestamp())
+            if not self._is_checkin_available(occurrence, now_ts):
+                status = self._get_occurrence_status(occurrence, now_ts)
                 context = {
-                    "occurrence": occurrence,
-                    "participants": participants,
+                    **base_context,
                     "checkin_ok": False,
                     "error": f"Check-in não está disponível. {status['status_text']}",
                     "code": None
                 }
                 return HTMXTemplate(template_name="checkin.html", context=context)
             
+            # Window is open: only now fetch the participant, by primary key
             participant = await participants_service.get(participant_id)
-            participants, _ = await participants_service.list_and_count()
-            
-            # Check if already checked in
-            existing_attendance = await attendance_service.get_by_occurrence_and_participant(occurrence_id, participant_id)
-            
-            if existing_attendance:
-                context = {
-                    "occurrence": occurrence,
-                    "participants": participants,
-                    "checkin_ok": False,
-                    "error": f"{participant.full_name} já fez check-in neste evento.",
-                    "code": None
-                }
-                return HTMXTemplate(template_name="checkin.html", context=context)
             
             # Generate security code for children (under 18)
-            from datetime import date
-            today = date.today()
             code = None
             code_hash = None
             
-            if participant.age_on(today) < 18:
-                code = secrets.token_hex(3).upper()  # 6-character code
-                code_hash = hashlib.sha256(code.encode()).hexdigest()
-            
-            # Create attendance record
-            attendance_data = {
-                "occurrence_id": occurrence_id,
-                "participant_id": participant_id,
-                "checkin_at": datetime.now(ZoneInfo("UTC")),
-                "code_hash": code_hash
-            }
+            if participant.is_minor(date.today()):
+                code = "".join(secrets.choice(_CODE_ALPHABET) for _ in range(_CODE_LENGTH))
+                code_hash = hmac.digest(settings.checkin_hmac_key, code.encode(), "sha256")
             
-            await attendance_service.create(attendance_data)
+            # Create attendance record; the unique key rejects a repeated check-in in the same INSERT
+            attendance = await attendance_service.checkin_atomic(occurrence_id, participant_id, now, code_hash)
+            if not attendance:
+                flash(request, f"{participant.full_name} já fez check-in neste evento.", category="error")
+                return _FLASH_ERROR_TEMPLATE
             
             context = {
-                "occurrence": occurrence,
-                "participants": participants,
+                **base_context,
                 "checkin_ok": True,
                 "error": None,
                 "code": code
@@ -399,14 +421,9 @@ class OccurrenceController(Controller):
             return HTMXTemplate(template_name="checkin.html", context=context)
             
         except Exception as e:
-            base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service)
-            context = {
-                **base_context,
-                "checkin_ok": False,
-                "error": f"Erro no check-in: {str(e)}",
-                "code": None
-            }
-            return HTMXTemplate(template_name="checkin.html", context=context)
+            # Keep the form on screen and only show the error
+            flash(request, f"Erro no check-in: {str(e)}", category="error")
+            return _FLASH_ERROR_TEMPLATE
         
 
     @get(path="/{occurrence_id:int}/checkout")
@@ -421,15 +438,16 @@ class OccurrenceController(Controller):
         ),
     ) -> Template:
         """Render the check-out form."""
-        require_profiles(request, ["admin", "organizer", "volunteer"])
         
         try:
-            base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service)
+            base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service, with_participants=False)
             occurrence = base_context["occurrence"]
             
             # Check if check-out is available
-            if not self._is_checkout_available(occurrence):
-                status = self._get_occurrence_status(occurrence)
+            now = datetime.now(_UTC)
+            now_ts = int(now.timestamp())
+            if not self._is_checkout_available(occurrence, now_ts):
+                status = self._get_occurrence_status(occurrence, now_ts)
                 context = {
                     **base_context,
                     "checkout_ok": False,
@@ -439,6 +457,7 @@ class OccurrenceController(Controller):
             
             context = {
                 **base_context,
+                "participants": await participants_service.list_cached(),
                 "checkout_ok": False,
                 "error": None
             }
@@ -468,127 +487,103 @@ class OccurrenceController(Controller):
         ),
     ) -> Template:
         """Process check-out."""
-        require_profiles(request, ["admin", "organizer", "volunteer"])
         try:
             form_data = await request.form()
+            # Occurrence and participants are loaded once and shared by every response below
+            base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service)
+            occurrence = base_context["occurrence"]
+
             participant_id_str = form_data.get("participant_id")
             if not participant_id_str:
-                flash(request, "ID do participante é obrigatório", category="error")
-                occurrence = await occurrences_service.get(occurrence_id)
-                participants, _ = await participants_service.list_and_count()
+                flash(request, _ERR_PARTICIPANT_REQUIRED, category="error")
                 context = {
-                    "occurrence": occurrence,
-                    "participants": participants,
+                    **base_context,
                     "checkout_ok": False,
-                    "error": "ID do participante é obrigatório"
+                    "error": _ERR_PARTICIPANT_REQUIRED
                 }
                 return HTMXTemplate(template_name="checkout.html", context=context)
             participant_id = int(participant_id_str)
             checkout_by_participant_id_str = form_data.get("checkout_by_participant_id")
             if not checkout_by_participant_id_str:
-                flash(request, "ID do responsável pelo check-out é obrigatório", category="error")
-                occurrence = await occurrences_service.get(occurrence_id)
-                participants, _ = await participants_service.list_and_count()
+                flash(request, _ERR_CHECKOUT_BY_REQUIRED, category="error")
                 context = {
-                    "occurrence": occurrence,
-                    "participants": participants,
+                    **base_context,
                     "checkout_ok": False,
-                    "error": "ID do responsável pelo check-out é obrigatório"
+                    "error": _ERR_CHECKOUT_BY_REQUIRED
                 }
                 return HTMXTemplate(template_name="checkout.html", context=context)
             checkout_by_participant_id = int(checkout_by_participant_id_str)
             code = form_data.get("code", "").strip()
             
-            occurrence = await occurrences_service.get(occurrence_id)
-            
             # Validate check-out window
-            if not self._is_checkout_available(occurrence):
-                status = self._get_occurrence_status(occurrence)
-                participant = await participants_service.get(participant_id)
-                participants, _ = await participants_service.list_and_count()
+            now = datetime.now(_UTC)
+            now_ts = int(now.timestamp())
+            if not self._is_checkout_available(occurrence, now_ts):
+                status = self._get_occurrence_status(occurrence, now_ts)
                 context = {
-                    "occurrence": occurrence,
-                    "participants": participants,
+                    **base_context,
                     "checkout_ok": False,
                     "error": f"Check-out não está disponível. {status['status_text']}"
                 }
                 return HTMXTemplate(template_name="checkout.html", context=context)
             
+            # The cached list only renders the dropdown; the submitted ids are read from the database
             participant = await participants_service.get(participant_id)
             checkout_by = await participants_service.get(checkout_by_participant_id)
-            participants, _ = await participants_service.list_and_count()
-            
-            # Find attendance record
-            attendance = await attendance_service.get_by_occurrence_and_participant(occurrence_id, participant_id)
-            
-            if not attendance:
-                context = {
-                    "occurrence": occurrence,
-                    "participants": participants,
-                    "checkout_ok": False,
-                    "error": f"{participant.full_name} não fez check-in neste evento."
-                }
-                return HTMXTemplate(template_name="checkout.html", context=context)
-            
-            if attendance.checkout_at:
-                context = {
-                    "occurrence": occurrence,
-                    "participants": participants,
-                    "checkout_ok": False,
-                    "error": f"{participant.full_name} já fez check-out."
-                }
-                return HTMXTemplate(template_name="checkout.html", context=context)
             
             # Validate code for children
-            from datetime import date
-            today = date.today()
-            
-            if participant.age_on(today) < 18:
+            code_hashes = None
+            if participant.is_minor(date.today()):
                 if not code:
                     context = {
-                        "occurrence": occurrence,
-                        "participants": participants,
+                        **base_context,
                         "checkout_ok": False,
-                        "error": "Código é obrigatório para menores de idade."
+                        "error": _ERR_CODE_REQUIRED
                     }
                     return HTMXTemplate(template_name="checkout.html", context=context)
                 
-                # Verify code
-                code_hash = hashlib.sha256(code.encode()).hexdigest()
-                if attendance.code_hash != code_hash:
+                code = code.upper()
+                if len(code) != _CODE_LENGTH or not _CODE_INPUT_CHARS.issuperset(code):
                     context = {
-                        "occurrence": occurrence,
-                        "participants": participants,
+                        **base_context,
                         "checkout_ok": False,
-                        "error": "Código inválido."
+                        "error": _ERR_CODE_INVALID
                     }
                     return HTMXTemplate(template_name="checkout.html", context=context)
+                code_hashes = (
+                    hmac.digest(settings.checkin_hmac_key, code.encode(), "sha256"),
+                    hashlib.sha256(code.encode()).digest(),
+                )
             
-            # Update attendance with checkout info
-            update_data = {
-                "checkout_at": datetime.now(ZoneInfo("UTC")),
-                "checkout_by_participant_id": checkout_by_participant_id
-            }
-            
-            await attendance_service.update(
-                update_data,
-                item_id=(occurrence_id, participant_id),
-                auto_commit=True
+            # Check-out in a single UPDATE; the database checks check-in, previous check-out and code
+            attendance = await attendance_service.checkout_atomic(
+                occurrence_id, participant_id, checkout_by_participant_id, code_hashes
             )
             
+            if not attendance:
+                # Failure path only: find out why to show the right message
+                existing = await attendance_service.get_by_occurrence_and_participant(occurrence_id, participant_id)
+                if not existing:
+                    error = f"{participant.full_name} não fez check-in neste evento."
+                elif existing.checkout_at:
+                    error = f"{participant.full_name} já fez check-out."
+                else:
+                    error = _ERR_CODE_INVALID
+                context = {
+                    **base_context,
+                    "checkout_ok": False,
+                    "error": error
+                }
+                return HTMXTemplate(template_name="checkout.html", context=context)
+            
             context = {
-                "occurrence": occurrence,
-                "participants": participants,
+                **base_context,
                 "checkout_ok": True,
                 "error": None
             }
             return HTMXTemplate(template_name="checkout.html", context=context)
             
         except Exception as e:
-            base_context = await self._get_base_context(occurrence_id, occurrences_service, participants_service)
-            context = {
-                **base_context,
-                "checkout_ok": False,
-                "error": f"Erro no check-out: {str(e)}"
-            }
-            return HTMXTemplate(template_name="checkout.html", context=context)
+            # Keep the form on screen and only show the error
+            flash(request, f"Erro no check-out: {str(e)}", category="error")
+            return _FLASH_ERROR_TEMPLATE
@@ -1,18 +1,62 @@
 from typing import Annotated
-from datetime import datetime, date
+from datetime import date
 from litestar import Controller, get, post, patch, delete, Request
 from litestar.params import Dependency, Parameter, Body
 from litestar.plugins.htmx import HTMXRequest, HTMXTemplate
 from litestar.plugins.flash import flash
 from litestar.response import Template
 from litestar.status_codes import HTTP_200_OK
+from litestar.datastructures import FormMultiDict
 from advanced_alchemy.extensions.litestar import filters, providers
-from services.participant_service import ParticipantService
+from services.participant_service import PAGE_SIZE, ParticipantService, adult_cutoff, invalidate_participants_cache
 from schemas import ParticipantRead, ParticipantCreate, ParticipantUpdate
 from models import ParticipantModel
 from middleware import require_profiles
 
 
+# Only the flash messages, swapped out-of-band; the request target gets an empty body
+_FLASH_OOB_TEMPLATE = HTMXTemplate(template_name="flash_messages.html", context={"oob": True})
+# Same, but leaves the request target untouched (failed writes: nothing changed on screen)
+_FLASH_ERROR_TEMPLATE = HTMXTemplate(template_name="flash_messages.html", context={"oob": True}, re_swap="none")
+
+
+def _participant_from_form(
+    form_data: FormMultiDict,
+    schema_type: type[ParticipantCreate] | type[ParticipantUpdate],
+) -> ParticipantCreate | ParticipantUpdate:
+    """Build the participant schema straight from the submitted form fields."""
+    guardian_id = form_data.get("guardian_id")
+    return schema_type(
+        full_name=form_data.get("full_name", ""),
+        birth_date=date.fromisoformat(form_data.get("birth_date", "")),
+        phone=form_data.get("phone", ""),
+        observations=form_data.get("observations", ""),
+        guardian_id=int(guardian_id) if guardian_id else None,
+    )
+
+
+async def _participant_list_template(
+    participants_service: ParticipantService,
+    filters: list[filters.FilterTypes] | None = None,
+    after_id: int | None = None,
+) -> Template:
+    """Render one page of the participant list, after ``after_id`` (keyset pagination)."""
+    # Uma linha a mais indica se existe próxima página
+    results = await participants_service.list_page(*(filters or []), after_id=after_id, limit=PAGE_SIZE + 1)
+    participants = results[:PAGE_SIZE]
+    today = date.today()
+
+    context = {
+        "participants": participants,
+        "has_participants": len(participants) > 0,
+        "next_after_id": participants[-1].id if len(results) > PAGE_SIZE else None,
+        "now": today,
+        # Adulto = nascido até esta data (uma vez por página, não por linha)
+        "adult_cutoff": adult_cutoff(today),
+    }
+    return HTMXTemplate(template_name="participant_list.html", context=context)
+
+
 class ParticipantController(Controller):
     """Participant CRUD endpoints"""
 
@@ -20,7 +64,7 @@ class ParticipantController(Controller):
         ParticipantService,
         "participants_service",
         load=[ParticipantModel.guardian],
-        filters={"pagination_type": "limit_offset", "id_filter": int, "search": "full_name", "search_ignore_case": True},
+        filters={"id_filter": int, "search": "full_name", "search_ignore_case": True},
     )
 
 
@@ -30,21 +74,10 @@ class ParticipantController(Controller):
         request: HTMXRequest,
         participants_service: ParticipantService,
         filters: Annotated[list[filters.FilterTypes], Dependency(skip_validation=True)],
+        after_id: int | None = None,
     ) -> Template:
-        """List all participants with pagination."""
-        results, total = await participants_service.list_and_count(*filters)
-
-        
-        context = {
-            "participants": results,
-            "total": total,
-            "has_participants": total > 0,
-            "now": datetime.now().date()
-        }
-        
-        # if request.htmx:
-        #     return HTMXTemplate(template_name="participant_list_content.html", context=context)
-        return HTMXTemplate(template_name="participant_list.html", context=context)
+        """List participants, one page at a time."""
+        return await _participant_list_template(participants_service, filters, after_id)
     
 
     @get(path="/participants/new")
@@ -52,12 +85,7 @@ class ParticipantController(Controller):
         """Render the participant creation form."""
         require_profiles(request, ["admin", "organizer"])
         # Get potential guardians (adults)
-
-        today = date.today()
-        adult_age = 18
-        
-        all_participants, _ = await participants_service.list_and_count()
-        guardians = [p for p in all_participants if p.age_on(today) >= adult_age]
+        guardians = await participants_service.list_guardians(date.today())
         
         context = {
             "participant": None,
@@ -75,55 +103,21 @@ class ParticipantController(Controller):
         """Create a new participant."""
         require_profiles(request, ["admin", "organizer"])
         try:
-            # Get form data from request
-            form_data = await request.form()
-
-            # Convert form data to ParticipantCreate schema
-            form_dict = {}
-
-            # Basic fields
-            form_dict["full_name"] = form_data.get("full_name", "")
-            form_dict["phone"] = form_data.get("phone", "")
-            form_dict["observations"] = form_data.get("observations", "")
+            participant_data = _participant_from_form(await request.form(), ParticipantCreate)
 
-            # Handle date field
-            birth_date = form_data.get("birth_date")
-            if birth_date:
-                form_dict["birth_date"] = date.fromisoformat(birth_date)
-
-            # Handle guardian_id
-            guardian_id_str = form_data.get("guardian_id")
-            if guardian_id_str:
-                form_dict["guardian_id"] = int(guardian_id_str)
-            else:
-                form_dict["guardian_id"] = None
-
-            # Create ParticipantCreate instance
-            from schemas import ParticipantCreate
-            participant_data = ParticipantCreate(**form_dict)
-
-            obj = await participants_service.create(participant_data)
+            # Commit before invalidating, so a concurrent request cannot refill the cache from pre-commit data
+            obj = await participants_service.create(participant_data, auto_commit=True)
+            invalidate_participants_cache()
             flash(request, f"Participante criado com sucesso!", category="success")
             
             # Return updated participant list
-            results, total = await participants_service.list_and_count()
-            context = {
-                "participants": results,
-                "total": total,
-                "has_participants": total > 0,
-                "now": datetime.now().date()
-            }
-            return HTMXTemplate(template_name="participant_list.html", context=context)
+            return await _participant_list_template(participants_service)
             
         except Exception as e:
             flash(request, f"Erro ao criar participante: {str(e)}", category="error")
             
             # Return form with error
-            today = date.today()
-            adult_age = 18
-            
-            all_participants, _ = await participants_service.list_and_count()
-            guardians = [p for p in all_participants if p.age_on(today) >= adult_age]
+            guardians = await participants_service.list_guardians(date.today())
             
             context = {
                 "participant": None,
@@ -147,11 +141,7 @@ class ParticipantController(Controller):
         participant = await participants_service.get(participant_id)
         
         # Get potential guardians (adults, excluding self)
-        today = date.today()
-        adult_age = 18
-        
-        all_participants, _ = await participants_service.list_and_count()
-        guardians = [p for p in all_participants if p.age_on(today) >= adult_age and p.id != participant_id]
+        guardians = await participants_service.list_guardians(date.today(), exclude_id=participant_id)
         
         context = {
             "participant": participant,
@@ -173,56 +163,21 @@ class ParticipantController(Controller):
         """Update a participant."""
         require_profiles(request, ["admin", "organizer"])
         try:
-            # Get form data from request
-            form_data = await request.form()
-
-            # Convert form data to ParticipantUpdate schema
-            form_dict = {}
-
-            # Basic fields
-            form_dict["full_name"] = form_data.get("full_name", "")
-            form_dict["phone"] = form_data.get("phone", "")
-            form_dict["observations"] = form_data.get("observations", "")
-
-            # Handle date field
-            birth_date = form_data.get("birth_date")
-            if birth_date:
-                form_dict["birth_date"] = date.fromisoformat(birth_date)
-
-            # Handle guardian_id
-            guardian_id_str = form_data.get("guardian_id")
-            if guardian_id_str:
-                form_dict["guardian_id"] = int(guardian_id_str)
-            else:
-                form_dict["guardian_id"] = None
-
-            # Create ParticipantUpdate instance
-            from schemas import ParticipantUpdate
-            participant_data = ParticipantUpdate(**form_dict)
+            participant_data = _participant_from_form(await request.form(), ParticipantUpdate)
 
             obj = await participants_service.update(participant_data, item_id=participant_id, auto_commit=True)
+            invalidate_participants_cache()
             flash(request, f"Participante atualizado com sucesso!", category="success")
 
             # Return updated participant list
-            results, total = await participants_service.list_and_count()
-            context = {
-                "participants": results,
-                "total": total,
-                "has_participants": total > 0,
-                "now": datetime.now().date()
-            }
-            return HTMXTemplate(template_name="participant_list.html", context=context)
+            return await _participant_list_template(participants_service)
 
         except Exception as e:
             flash(request, f"Erro ao atualizar participante: {str(e)}", category="error")
 
             # Return form with error
             participant = await participants_service.get(participant_id)
-            today = date.today()
-            adult_age = 18
-
-            all_participants, _ = await participants_service.list_and_count()
-            guardians = [p for p in all_participants if p.age_on(today) >= adult_age and p.id != participant_id]
+            guardians = await participants_service.list_guardians(date.today(), exclude_id=participant_id)
 
             context = {
                 "participant": participant,
@@ -244,21 +199,17 @@ class ParticipantController(Controller):
         """Delete a participant from the system."""
         require_profiles(request, ["admin", "organizer"])
         try:
-            participant = await participants_service.get(participant_id)
-            participant_name = participant.full_name
-            await participants_service.delete(participant_id)
+            # delete() returns the removed row: no separate get() for the name
+            participant = await participants_service.delete(participant_id, auto_commit=True)
+            invalidate_participants_cache()
+            
+            flash(request, f"{participant.full_name} excluído com sucesso!", category="success")
             
-            flash(request, f"{participant_name} excluído com sucesso!", category="success")
+            # The card (hx-target) is replaced by nothing; only the flash message is swapped in
+            return _FLASH_OOB_TEMPLATE
             
         except Exception as e:
             flash(request, f"Erro ao excluir participante: {str(e)}", category="error")
-        
-        # Return updated participant list
-        results, total = await participants_service.list_and_count()
-        context = {
-            "participants": results,
-            "total": total,
-            "has_participants": total > 0,
-            "now": datetime.now().date()
-        }
-        return HTMXTemplate(template_name="participant_list.html", context=context)
\ No newline at end of file
+            
+            # Keep the card in place and only show the error
+            return _FLASH_ERROR_TEMPLATE
\ No newline at end of file
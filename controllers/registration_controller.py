@@ -1,5 +1,4 @@
 from typing import Annotated
-from datetime import datetime
 
 from litestar import Controller, get, post, patch
 from litestar.params import Body
@@ -11,14 +10,15 @@ from litestar.status_codes import HTTP_302_FOUND
 from advanced_alchemy.extensions.litestar import providers
 from services.registration_service import RegistrationService
 from services.user_service import UserService
-from models import RegistrationRequestModel, UserModel
-from middleware import require_profiles
+from models import RegistrationRequestModel
+from middleware import admin_guard
 
 
 class RegistrationController(Controller):
     """Registration request management endpoints (admin only)"""
     
     path = "/registrations"
+    guards = [admin_guard]
     
     dependencies = {
         **providers.create_service_dependencies(RegistrationService, "registration_service"),
@@ -30,13 +30,14 @@ class RegistrationController(Controller):
         self,
         request: HTMXRequest,
         registration_service: RegistrationService,
+        status: str | None = None,
     ) -> Template:
-        """List all registration requests (admin only)."""
-        require_profiles(request, ["admin"])
-        
-        # Get all registration requests, ordered by most recent first
-        requests, _ = await registration_service.list_and_count()
-        requests = sorted(requests, key=lambda r: r.requested_at, reverse=True)
+        """List registration requests, optionally only those with the given status (admin only)."""
+        # Most recent first, sorted by the database (ix_registration_requests_requested_at_desc)
+        conditions = [RegistrationRequestModel.status == status] if status else []
+        requests = await registration_service.list(
+            *conditions, order_by=[RegistrationRequestModel.requested_at.desc()]
+        )
         
         return HTMXTemplate(
             template_name="registration_list.html",
@@ -51,8 +52,6 @@ class RegistrationController(Controller):
         registration_service: RegistrationService,
     ) -> Template:
         """View and edit a specific registration request (admin only)."""
-        require_profiles(request, ["admin"])
-        
         registration_request = await registration_service.get(request_id)
         
         if not registration_request:
@@ -74,8 +73,6 @@ class RegistrationController(Controller):
         users_service: UserService,
     ) -> Redirect:
         """Approve a registration request and create the user (admin only)."""
-        require_profiles(request, ["admin"])
-        
         try:
             # Get the registration request
             registration_request = await registration_service.get(request_id)
@@ -98,33 +95,25 @@ class RegistrationController(Controller):
             if profile == "":
                 profile = None
             
-            # Check if username or email already exists in users
-            users, _ = await users_service.list_and_count()
-            if any(u.username == username for u in users):
+            # Check if username or email already exists in users (one indexed query for both)
+            existing_users = await users_service.find_existing(username, email)
+            if any(u.username == username for u in existing_users):
                 flash(request, "Nome de usuário já existe. Por favor, edite antes de aprovar.", category="error")
                 return Redirect(path=f"/registrations/{request_id}", status_code=HTTP_302_FOUND)
             
-            if any(u.email == email for u in users):
+            if existing_users:
                 flash(request, "Email já está cadastrado. Por favor, edite antes de aprovar.", category="error")
                 return Redirect(path=f"/registrations/{request_id}", status_code=HTTP_302_FOUND)
             
-            # Create the user
-            user = UserModel(
-                username=username,
-                email=email,
-                password_hash=registration_request.password_hash,  # Use the hashed password from request
-                profile=profile,
-                is_active=True
+            # Claim the request (only if still pending) and create the user in the same transaction
+            approved = await registration_service.mark_reviewed(
+                request_id, "approved", request.session.get("user_id")
             )
+            if approved is None:
+                flash(request, "Esta solicitação já foi processada", category="warning")
+                return Redirect(path="/registrations", status_code=HTTP_302_FOUND)
             
-            # Add user to database
-            users_service.repository.session.add(user)
-            await users_service.repository.session.flush()
-            
-            # Update registration request status
-            registration_request.status = "approved"
-            registration_request.reviewed_at = datetime.now()
-            registration_request.reviewed_by_user_id = request.session.get("user_id")
+            await users_service.create_active(username, email, registration_request.password_hash, profile)
             
             await registration_service.repository.session.commit()
             
@@ -132,6 +121,8 @@ class RegistrationController(Controller):
             return Redirect(path="/registrations", status_code=HTTP_302_FOUND)
             
         except Exception as e:
+            # Desfaz a aprovação parcial (o autocommit confirmaria a transação no redirect)
+            await registration_service.repository.session.rollback()
             flash(request, f"Erro ao aprovar solicitação: {str(e)}", category="error")
             return Redirect(path="/registrations", status_code=HTTP_302_FOUND)
 
@@ -144,33 +135,22 @@ class RegistrationController(Controller):
         registration_service: RegistrationService,
     ) -> Redirect:
         """Reject a registration request (admin only)."""
-        require_profiles(request, ["admin"])
-        
         try:
-            # Get the registration request
-            registration_request = await registration_service.get(request_id)
-            
-            if not registration_request:
-                flash(request, "Solicitação de registro não encontrada", category="error")
-                return Redirect(path="/registrations", status_code=HTTP_302_FOUND)
-            
-            if registration_request.status != "pending":
-                flash(request, "Esta solicitação já foi processada", category="warning")
-                return Redirect(path="/registrations", status_code=HTTP_302_FOUND)
-            
             # Get rejection reason from form
             form_data = await request.form()
             rejection_reason = form_data.get("rejection_reason", "")
             
-            # Update registration request status
-            registration_request.status = "rejected"
-            registration_request.reviewed_at = datetime.now()
-            registration_request.reviewed_by_user_id = request.session.get("user_id")
-            registration_request.rejection_reason = rejection_reason if rejection_reason else None
+            # Update registration request status (only if it exists and is still pending)
+            username = await registration_service.mark_reviewed(
+                request_id, "rejected", request.session.get("user_id"), rejection_reason or None
+            )
+            if username is None:
+                flash(request, "Solicitação não encontrada ou já processada", category="warning")
+                return Redirect(path="/registrations", status_code=HTTP_302_FOUND)
             
             await registration_service.repository.session.commit()
             
-            flash(request, f"Solicitação de {registration_request.username} rejeitada.", category="info")
+            flash(request, f"Solicitação de {username} rejeitada.", category="info")
             return Redirect(path="/registrations", status_code=HTTP_302_FOUND)
             
         except Exception as e:
@@ -186,43 +166,34 @@ class RegistrationController(Controller):
         registration_service: RegistrationService,
     ) -> Template:
         """Update registration request details before approval (admin only)."""
-        require_profiles(request, ["admin"])
-
+        registration_request = None
         try:
-            # Get the registration request
-            registration_request = await registration_service.get(request_id)
-
-            if not registration_request:
-                flash(request, "Solicitação de registro não encontrada", category="error")
-                return HTMXTemplate(
-                    template_name="registration_edit.html",
-                    context={"registration_request": None}
-                )
-
-            if registration_request.status != "pending":
-                flash(request, "Apenas solicitações pendentes podem ser editadas", category="warning")
-                return HTMXTemplate(
-                    template_name="registration_edit.html",
-                    context={"registration_request": registration_request}
-                )
-
             # Get form data
             form_data = await request.form()
-            username = form_data.get("username")
-            email = form_data.get("email")
+            values = {
+                field: value for field in ("username", "email") if (value := form_data.get(field))
+            }
             profile = form_data.get("profile")
-
-            # Convert empty string to None for profile
-            if profile == "":
-                profile = None
-
-            # Update fields
-            if username:
-                registration_request.username = username
-            if email:
-                registration_request.email = email
             if profile is not None:
-                registration_request.profile = profile
+                # Convert empty string to None for profile
+                values["profile"] = profile or None
+
+            # Update only while pending, returning the updated row
+            if values:
+                registration_request = await registration_service.update_pending(request_id, **values)
+
+            if registration_request is None:
+                registration_request = await registration_service.get_one_or_none(id=request_id)
+                if not registration_request:
+                    flash(request, "Solicitação de registro não encontrada", category="error")
+                elif registration_request.status != "pending":
+                    flash(request, "Apenas solicitações pendentes podem ser editadas", category="warning")
+                else:
+                    flash(request, "Solicitação atualizada com sucesso", category="success")
+                return HTMXTemplate(
+                    template_name="registration_edit.html",
+                    context={"registration_request": registration_request}
+                )
 
             await registration_service.repository.session.commit()
 
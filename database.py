@@ -1,10 +1,15 @@
+import time
+from collections import OrderedDict
+
 from sqlalchemy.pool import AsyncAdaptedQueuePool
+from litestar.stores.base import Store
 from advanced_alchemy.extensions.litestar import (
     AsyncSessionConfig,
     SQLAlchemyAsyncConfig,
     SQLAlchemyPlugin,
     EngineConfig
 )
+from advanced_alchemy.extensions.litestar.session import SQLAlchemyAsyncSessionBackend
 from config import settings
 
 
@@ -14,12 +19,68 @@ alchemy_config = SQLAlchemyAsyncConfig(
     connection_string=settings.database_url,
     engine_config=EngineConfig(
         poolclass=AsyncAdaptedQueuePool,
-        pool_size=20,
-        max_overflow=30,
-        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=30,
+        # Recicla antes do timeout ocioso típico do servidor; pre-ping (SELECT 1 a cada checkout) só se configurado
+        pool_recycle=1800,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_use_lifo=True,
     ),
     before_send_handler="autocommit",
     session_config=db_session_config,
-    create_all=True,
+    # Schema via Alembic (litestar database upgrade) / init_db.py; create_all só em desenvolvimento
+    create_all=settings.debug,
 )
-alchemy_plugin = SQLAlchemyPlugin(config=alchemy_config)
\ No newline at end of file
+alchemy_plugin = SQLAlchemyPlugin(config=alchemy_config)
+
+
+class CachedSQLAlchemySessionBackend(SQLAlchemyAsyncSessionBackend):
+    """SQLAlchemy session backend fronted by a short-lived in-process cache.
+
+    A cache hit skips the SELECT + expiry UPDATE on load, and an unchanged session
+    skips the UPSERT on save; the row's expiry is still refreshed at least every TTL.
+    """
+
+    def __init__(self, *args, ttl: float = 30.0, max_entries: int = 10_000, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._ttl = ttl
+        self._max_entries = max_entries
+        # session_id -> (instante da última leitura/gravação no banco, dados serializados), mais antigas primeiro
+        self._cache: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def _cached(self, session_id: str) -> bytes | None:
+        entry = self._cache.get(session_id)
+        if entry is not None and time.monotonic() - entry[0] < self._ttl:
+            return entry[1]
+        return None
+
+    def _remember(self, session_id: str, data: bytes) -> None:
+        now = time.monotonic()
+        self._cache[session_id] = (now, data)
+        self._cache.move_to_end(session_id)
+        # Descarta pela frente as expiradas e, acima do limite, as menos recentes
+        while self._cache and (
+            len(self._cache) > self._max_entries or now - next(iter(self._cache.values()))[0] >= self._ttl
+        ):
+            self._cache.popitem(last=False)
+
+    async def get(self, /, session_id: str, store: Store) -> bytes | None:
+        if (data := self._cached(session_id)) is not None:
+            return data
+        data = await super().get(session_id, store)
+        if data is None:
+            self._cache.pop(session_id, None)
+        else:
+            self._remember(session_id, data)
+        return data
+
+    async def set(self, /, session_id: str, data: bytes, store: Store) -> None:
+        if self._cached(session_id) == data:
+            return
+        await super().set(session_id, data, store)
+        self._remember(session_id, data)
+
+    async def delete(self, /, session_id: str, store: Store) -> None:
+        self._cache.pop(session_id, None)
+        await super().delete(session_id, store)
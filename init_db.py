@@ -6,10 +6,10 @@ This script creates the database tables and optionally adds sample data.
 
 import asyncio
 from datetime import date, datetime, timedelta
-from advanced_alchemy.extensions.litestar import create_engine_from_config
 from config import settings
 from database import alchemy_config
 from models import UserModel, ParticipantModel, EventModel, EventOccurrenceModel
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -17,7 +17,7 @@ async def init_database():
     """Initialize the database with tables and sample data."""
     
     # Create engine
-    engine = create_engine_from_config(alchemy_config)
+    engine = alchemy_config.get_engine()
     
     # Create all tables
     async with engine.begin() as conn:
@@ -43,66 +43,75 @@ async def init_database():
         admin_user.set_password("admin123")
         session.add(admin_user)
         
-        # Create sample participants
-        participants = [
-            ParticipantModel(
-                full_name="João Silva",
-                birth_date=date(1985, 3, 15),
-                phone="(11) 99999-1111",
-                observations="Responsável"
-            ),
-            ParticipantModel(
-                full_name="Maria Santos",
-                birth_date=date(1990, 7, 22),
-                phone="(11) 99999-2222",
-                observations="Organizadora"
-            ),
-            ParticipantModel(
-                full_name="Pedro Silva",
-                birth_date=date(2015, 5, 10),
-                phone=None,
-                observations="Filho do João",
-                guardian_id=1  # Will be set after João is saved
-            ),
-            ParticipantModel(
-                full_name="Ana Santos",
-                birth_date=date(2012, 12, 3),
-                phone=None,
-                observations="Filha da Maria",
-                guardian_id=2  # Will be set after Maria is saved
-            )
-        ]
+        # Create sample participants: adults first (RETURNING ids), then their children
+        adult_ids = (await session.scalars(
+            insert(ParticipantModel).returning(ParticipantModel.id, sort_by_parameter_order=True),
+            [
+                {
+                    "full_name": "João Silva",
+                    "birth_date": date(1985, 3, 15),
+                    "phone": "(11) 99999-1111",
+                    "observations": "Responsável",
+                },
+                {
+                    "full_name": "Maria Santos",
+                    "birth_date": date(1990, 7, 22),
+                    "phone": "(11) 99999-2222",
+                    "observations": "Organizadora",
+                },
+            ],
+        )).all()
+        joao_id, maria_id = adult_ids
         
-        for participant in participants:
-            session.add(participant)
+        await session.execute(
+            insert(ParticipantModel),
+            [
+                {
+                    "full_name": "Pedro Silva",
+                    "birth_date": date(2015, 5, 10),
+                    "phone": None,
+                    "observations": "Filho do João",
+                    "guardian_id": joao_id,
+                },
+                {
+                    "full_name": "Ana Santos",
+                    "birth_date": date(2012, 12, 3),
+                    "phone": None,
+                    "observations": "Filha da Maria",
+                    "guardian_id": maria_id,
+                },
+            ],
+        )
         
-        # Create sample events
+        # Create sample events (one executemany INSERT)
         today = datetime.now()
         
-        # Single event
-        single_event = EventModel(
-            name="Workshop de Python",
-            description="Introdução ao desenvolvimento web com Python e Litestar",
-            is_recurring=False,
-            single_start=today + timedelta(days=7, hours=2),
-            single_end=today + timedelta(days=7, hours=6)
-        )
-        session.add(single_event)
-        
-        # Recurring event
-        recurring_event = EventModel(
-            name="Aula de Música",
-            description="Aulas semanais de música para crianças",
-            is_recurring=True,
-            recurrence_start_date=today.date(),
-            recurrence_end_date=today.date() + timedelta(days=90),
-            recurrence_rule={
-                "frequency": "weekly",
-                "weekdays": [1, 3],  # Tuesday and Thursday
-                "time_windows": [{"start": "14:00", "end": "16:00"}]
-            }
+        await session.execute(
+            insert(EventModel),
+            [
+                # Single event
+                {
+                    "name": "Workshop de Python",
+                    "description": "Introdução ao desenvolvimento web com Python e Litestar",
+                    "is_recurring": False,
+                    "single_start": today + timedelta(days=7, hours=2),
+                    "single_end": today + timedelta(days=7, hours=6),
+                },
+                # Recurring event
+                {
+                    "name": "Aula de Música",
+                    "description": "Aulas semanais de música para crianças",
+                    "is_recurring": True,
+                    "recurrence_start_date": today.date(),
+                    "recurrence_end_date": today.date() + timedelta(days=90),
+                    "recurrence_rule": {
+                        "frequency": "weekly",
+                        "weekdays": [1, 3],  # Tuesday and Thursday
+                        "time_windows": [{"start": "14:00", "end": "16:00"}]
+                    },
+                },
+            ],
         )
-        session.add(recurring_event)
         
         await session.commit()
         print("✅ Sample data added successfully!")
@@ -1,5 +1,7 @@
 from typing import Any, Optional
 from litestar import Request, Response
+from litestar.connection import ASGIConnection
+from litestar.handlers.base import BaseRouteHandler
 from litestar.middleware.base import AbstractMiddleware
 from litestar.response import Redirect
 from litestar.status_codes import HTTP_302_FOUND, HTTP_403_FORBIDDEN
@@ -9,33 +11,23 @@ from litestar.exceptions import PermissionDeniedException
 class AuthMiddleware(AbstractMiddleware):
     """Simple authentication middleware."""
     
-    # Routes that don't require authentication
-    EXEMPT_ROUTES = {
-        "/auth/login",
-        "/auth/register", 
-        "/static",
-        "/favicon.ico"
-    }
+    # Routes that don't require authentication (prefixes) and static file extensions;
+    # tuples so str.startswith/endswith do the scan in C
+    EXEMPT_PREFIXES = ("/auth/login", "/auth/register", "/static", "/favicon.ico")
+    EXEMPT_SUFFIXES = (".css", ".js", ".ico", ".png", ".jpg", ".jpeg", ".gif")
     
     def __init__(self, app: Any) -> None:
         super().__init__(app)
     
     async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
-        request = Request(scope)
-        
-        # Skip authentication for exempt routes
-        if any(request.url.path.startswith(route) for route in self.EXEMPT_ROUTES):
-            await self.app(scope, receive, send)
-            return
-        
-        # Skip authentication for static files and API endpoints
-        if (request.url.path.startswith("/static/") or 
-            request.url.path.endswith((".css", ".js", ".ico", ".png", ".jpg", ".jpeg", ".gif"))):
+        # Skip authentication for exempt routes and static files (no Request needed)
+        path = scope["path"]
+        if path.startswith(self.EXEMPT_PREFIXES) or path.endswith(self.EXEMPT_SUFFIXES):
             await self.app(scope, receive, send)
             return
         
-        # Check if user is authenticated
-        user_id = request.session.get("user_id")
+        # Check if user is authenticated (session dict set on the scope by SessionMiddleware)
+        user_id = scope["session"].get("user_id")
         
         if not user_id:
             # Redirect to login page
@@ -47,6 +39,11 @@ class AuthMiddleware(AbstractMiddleware):
         await self.app(scope, receive, send)
 
 
+# Perfis permitidos pelos guards e helpers (constantes para não alocar a cada requisição)
+_ADMIN_ORGANIZER = frozenset(("admin", "organizer"))
+_CHECKIN_CHECKOUT = frozenset(("admin", "organizer", "volunteer"))
+
+
 def get_user_profile(request: Request) -> Optional[str]:
     """Get the current user's profile from session."""
     return request.session.get("profile")
@@ -71,11 +68,27 @@ def require_profiles(request: Request, allowed_profiles: list[str]) -> None:
 
 def is_admin_or_organizer(request: Request) -> bool:
     """Check if user is Administrator or Organizer."""
-    profile = get_user_profile(request)
-    return profile in ["admin", "organizer"]
+    return get_user_profile(request) in _ADMIN_ORGANIZER
 
 
 def can_checkin_checkout(request: Request) -> bool:
     """Check if user can perform check-in/check-out operations."""
-    profile = get_user_profile(request)
-    return profile in ["admin", "organizer", "volunteer"]
\ No newline at end of file
+    return get_user_profile(request) in _CHECKIN_CHECKOUT
+
+
+def admin_guard(connection: ASGIConnection, _: BaseRouteHandler) -> None:
+    """Guard: allow only the Administrator profile."""
+    if connection.session.get("profile") != "admin":
+        raise PermissionDeniedException(detail="Acesso negado. Perfis permitidos: admin")
+
+
+def admin_organizer_guard(connection: ASGIConnection, _: BaseRouteHandler) -> None:
+    """Guard: allow only Administrator or Organizer profiles."""
+    if connection.session.get("profile") not in _ADMIN_ORGANIZER:
+        raise PermissionDeniedException(detail="Acesso negado. Perfis permitidos: admin, organizer")
+
+
+def checkin_checkout_guard(connection: ASGIConnection, _: BaseRouteHandler) -> None:
+    """Guard: allow profiles that can perform check-in/check-out operations."""
+    if connection.session.get("profile") not in _CHECKIN_CHECKOUT:
+        raise PermissionDeniedException(detail="Acesso negado. Perfis permitidos: admin, organizer, volunteer")
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""attendance code hmac
+
+Revision ID: 8d41a6e0b9c3
+Revises: 5b3e9f1c2a7d
+Create Date: 2026-10-15 11:02:47.530918-03:00
+
+"""
+
+import warnings
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC, StoredObject, PasswordHash
+from sqlalchemy import Text  # noqa: F401
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+sa.StoredObject = StoredObject
+
+# revision identifiers, used by Alembic.
+revision = '8d41a6e0b9c3'
+down_revision = '5b3e9f1c2a7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    # Keep the old SHA-256 hex digests as raw bytes: check-out still accepts them, so
+    # children checked in before this migration can be checked out with their code
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.alter_column('code_hash',
+               existing_type=sa.String(length=200),
+               type_=sa.LargeBinary(length=32),
+               existing_nullable=True,
+               postgresql_using="decode(code_hash, 'hex')")
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    # HMACs cannot be turned back into plain SHA-256 digests
+    op.execute("UPDATE attendance SET code_hash = NULL")
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.alter_column('code_hash',
+               existing_type=sa.LargeBinary(length=32),
+               type_=sa.String(length=200),
+               existing_nullable=True,
+               postgresql_using="encode(code_hash, 'hex')")
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
@@ -0,0 +1,76 @@
+"""occurrence checkin window
+
+Revision ID: 3c7a2e9d4f16
+Revises: 8d41a6e0b9c3
+Create Date: 2026-10-15 14:26:09.184302-03:00
+
+"""
+
+import warnings
+from typing import TYPE_CHECKING
+
+import sqlalchemy as sa
+from alembic import op
+from advanced_alchemy.types import EncryptedString, EncryptedText, GUID, ORA_JSONB, DateTimeUTC, StoredObject, PasswordHash
+from sqlalchemy import Text  # noqa: F401
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+__all__ = ["downgrade", "upgrade", "schema_upgrades", "schema_downgrades", "data_upgrades", "data_downgrades"]
+
+sa.GUID = GUID
+sa.DateTimeUTC = DateTimeUTC
+sa.ORA_JSONB = ORA_JSONB
+sa.EncryptedString = EncryptedString
+sa.EncryptedText = EncryptedText
+sa.StoredObject = StoredObject
+
+# revision identifiers, used by Alembic.
+revision = '3c7a2e9d4f16'
+down_revision = '8d41a6e0b9c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            schema_upgrades()
+            data_upgrades()
+
+def downgrade() -> None:
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=UserWarning)
+        with op.get_context().autocommit_block():
+            data_downgrades()
+            schema_downgrades()
+
+def schema_upgrades() -> None:
+    """schema upgrade migrations go here."""
+    with op.batch_alter_table('event_occurrences', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('checkin_opens_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('checkin_closes_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Preenche a janela das ocorrências existentes antes de exigir NOT NULL
+    op.execute(
+        "UPDATE event_occurrences SET checkin_opens_at = start_at - interval '2 hours', "
+        "checkin_closes_at = end_at - interval '40 minutes'"
+    )
+
+    with op.batch_alter_table('event_occurrences', schema=None) as batch_op:
+        batch_op.alter_column('checkin_opens_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+        batch_op.alter_column('checkin_closes_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+def schema_downgrades() -> None:
+    """schema downgrade migrations go here."""
+    with op.batch_alter_table('event_occurrences', schema=None) as batch_op:
+        batch_op.drop_column('checkin_closes_at')
+        batch_op.drop_column('checkin_opens_at')
+
+def data_upgrades() -> None:
+    """Add any optional data upgrade migrations here!"""
+
+def data_downgrades() -> None:
+    """Add any optional data downgrade migrations here!"""
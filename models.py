@@ -1,11 +1,38 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Optional, List, Dict, Any
 from advanced_alchemy.extensions.litestar import base
 from advanced_alchemy.extensions.litestar.session import SessionModelMixin
 from sqlalchemy import (
-    String, Integer, Date, DateTime, Boolean, ForeignKey, UniqueConstraint, JSON, func, Index, text
+    String, Integer, Date, DateTime, Boolean, ForeignKey, LargeBinary, UniqueConstraint, func, Index, text
 )
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from passlib.context import CryptContext
+import anyio
+from config import settings
+
+
+# Idade a partir da qual o participante é adulto
+ADULT_AGE = 18
+
+# Check-in abre 2h antes do início e fecha 40min antes do fim
+CHECKIN_OPENS_BEFORE = timedelta(hours=2)
+CHECKIN_CLOSES_BEFORE_END = timedelta(minutes=40)
+
+
+# Idade por (nascimento, data de referência); na lista de check-in a data é sempre a mesma
+@lru_cache(maxsize=4096)
+def _age_on(birth_date: date, on_date: date) -> int:
+    """Age in whole years on ``on_date`` of someone born on ``birth_date``."""
+    years = on_date.year - birth_date.year
+    before_birthday = (on_date.month, on_date.day) < (birth_date.month, birth_date.day)
+    return years - int(before_birthday)
+
+
+# Password hashing context shared by UserModel and RegistrationRequestModel
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=settings.bcrypt_rounds, deprecated="auto")
 
 
 class ParticipantModel(base.DefaultBase):
@@ -20,11 +47,27 @@ class ParticipantModel(base.DefaultBase):
 
     guardian: Mapped[Optional["ParticipantModel"]] = relationship(remote_side=[id], backref="dependents")
 
+    # 4 últimos dígitos do telefone (usado na busca do check-in)
+    @hybrid_property
+    def phone_last4(self) -> Optional[str]:
+        return self.phone[-4:] if self.phone else None
+
+    @phone_last4.inplace.expression
+    @classmethod
+    def _phone_last4_expression(cls):
+        return func.right(cls.phone, 4)
+
     # helper para calcular idade numa data de referência
     def age_on(self, on_date: date) -> int:
-        years = on_date.year - self.birth_date.year
-        before_birthday = (on_date.month, on_date.day) < (self.birth_date.month, self.birth_date.day)
-        return years - int(before_birthday)
+        return _age_on(self.birth_date, on_date)
+
+    # menor de idade na data de referência (exige código no check-out)
+    def is_minor(self, on_date: date) -> bool:
+        return self.age_on(on_date) < ADULT_AGE
+
+    __table_args__ = (
+        Index("ix_participant_birth_date", "birth_date"),
+    )
 
 
 class EventModel(base.DefaultBase):
@@ -48,9 +91,15 @@ class EventModel(base.DefaultBase):
     #   "weekdays": [0],      # 0=Monday ... 6=Sunday (padrão Python)
     #   "time_windows": [{"start": "10:00", "end": "12:00"}, {"start": "18:00", "end": "20:00"}]
     # }
-    recurrence_rule: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    # JSONB: armazenado já decodificado no PostgreSQL (sem reparse do texto a cada leitura)
+    recurrence_rule: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSONB)
+    # Usado no ETag da página inicial
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=True)
 
-    occurrences: Mapped[List["EventOccurrenceModel"]] = relationship(back_populates="event", cascade="all, delete-orphan", lazy="selectin")
+    # Carregamento opt-in por consulta (selectinload); o ON DELETE CASCADE do banco remove as ocorrências
+    occurrences: Mapped[List["EventOccurrenceModel"]] = relationship(
+        back_populates="event", cascade="all, delete-orphan", lazy="raise", passive_deletes=True
+    )
 
 
 class EventOccurrenceModel(base.DefaultBase):
@@ -60,9 +109,22 @@ class EventOccurrenceModel(base.DefaultBase):
     event_id: Mapped[int] = mapped_column(ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
     start_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     end_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Janela de check-in gravada na criação (ocorrências são recriadas, nunca remarcadas)
+    checkin_opens_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda context: context.get_current_parameters()["start_at"] - CHECKIN_OPENS_BEFORE,
+    )
+    checkin_closes_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda context: context.get_current_parameters()["end_at"] - CHECKIN_CLOSES_BEFORE_END,
+    )
 
     event: Mapped[EventModel] = relationship(back_populates="occurrences", lazy="joined", innerjoin=True, viewonly=True)
-    attendances: Mapped[List["AttendanceModel"]] = relationship(back_populates="occurrence", cascade="all, delete-orphan", lazy="selectin")
+    attendances: Mapped[List["AttendanceModel"]] = relationship(
+        back_populates="occurrence", cascade="all, delete-orphan", lazy="raise", passive_deletes=True
+    )
 
     __table_args__ = (
         UniqueConstraint("event_id", "start_at", "end_at", name="uq_occurrence_unique_window"),
@@ -82,8 +144,8 @@ class AttendanceModel(base.DefaultBase):
     checkin_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     checkout_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
 
-    # Código de segurança: guardamos apenas o hash
-    code_hash: Mapped[Optional[str]] = mapped_column(String(200), nullable=True)
+    # Código de segurança: guardamos apenas o HMAC-SHA256 (32 bytes)
+    code_hash: Mapped[Optional[bytes]] = mapped_column(LargeBinary(32), nullable=True)
 
     # Quem realizou o checkout (opcional; para criança deve ser o guardião)
     checkout_by_participant_id: Mapped[Optional[int]] = mapped_column(ForeignKey("participants.id"))
@@ -93,8 +155,8 @@ class AttendanceModel(base.DefaultBase):
     occurrence: Mapped[EventOccurrenceModel] = relationship(back_populates="attendances", lazy="joined", innerjoin=True, viewonly=True)
 
     __table_args__ = (
-        UniqueConstraint("occurrence_id", "participant_id", name="uq_attendance_once"),
-        Index("ix_attendance_checkin", "checkin_at"),
+        # Consultas por participante e o ON DELETE CASCADE ao excluir um participante
+        Index("ix_attendance_participant_checkin", "participant_id", "checkin_at"),
     )
 
 
@@ -128,9 +190,12 @@ class UserModel(base.DefaultBase):
         Index("ix_users_created_at_desc", text("created_at DESC")),
     )
 
-    def set_password(self, raw_password: str) -> None:        
-        from passlib.hash import bcrypt
-        self.password_hash = bcrypt.hash(raw_password)
+    def set_password(self, raw_password: str) -> None:
+        self.password_hash = pwd_context.hash(raw_password)
+
+    async def set_password_async(self, raw_password: str) -> None:
+        """Hash the password in a worker thread so bcrypt does not block the event loop."""
+        self.password_hash = await anyio.to_thread.run_sync(pwd_context.hash, raw_password)
 
 
 class RegistrationRequestModel(base.DefaultBase):
@@ -158,6 +223,9 @@ class RegistrationRequestModel(base.DefaultBase):
     )
 
     def set_password(self, raw_password: str) -> None:
-        from passlib.hash import bcrypt
-        self.password_hash = bcrypt.hash(raw_password)
+        self.password_hash = pwd_context.hash(raw_password)
+
+    async def set_password_async(self, raw_password: str) -> None:
+        """Hash the password in a worker thread so bcrypt does not block the event loop."""
+        self.password_hash = await anyio.to_thread.run_sync(pwd_context.hash, raw_password)
 
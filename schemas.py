@@ -2,39 +2,38 @@ from datetime import datetime, date
 import msgspec
 
 
+# DTOs são dados simples e nunca formam ciclos; gc=False evita rastreio pelo GC
 class BaseSchema(
     msgspec.Struct,
     omit_defaults=True,
     forbid_unknown_fields=True,
     rename="kebab",
+    gc=False,
 ):
     pass
 
 # ################################################
 # -- User
 
-class UserRead(BaseSchema):
-    id: int
+class _UserBase(BaseSchema):
     username: str
     email: str
     is_active: bool
-    created_at: datetime
     profile: str | None = None
+
+
+class UserRead(_UserBase, kw_only=True):
+    id: int
+    created_at: datetime
     updated_at: datetime | None = None
 
 
-class UserCreate(BaseSchema):
-    username: str
-    email: str
-    is_active: bool
-    profile: str | None = None
+class UserCreate(_UserBase):
+    pass
 
 
-class UserUpdate(BaseSchema):
-    username: str
-    email: str
-    is_active: bool
-    profile: str | None = None
+class UserUpdate(_UserBase):
+    pass
 
 
 class UserLogin(BaseSchema):
@@ -89,14 +88,14 @@ class AttendanceRead(BaseSchema):
     participant_id: int
     checkin_at: datetime
     checkout_at: datetime | None = None
-    code_hash: str | None = None
+    code_hash: bytes | None = None
     checkout_by_participant_id: int | None = None
 
 
 class AttendanceCreate(BaseSchema):
     occurrence_id: int
     participant_id: int
-    code_hash: str | None = None
+    code_hash: bytes | None = None
 
 
 class AttendanceUpdate(BaseSchema):
@@ -112,8 +111,7 @@ class EventOccurrenceRead(BaseSchema):
     attendances: list[AttendanceRead] = []
 
 
-class EventRead(BaseSchema):
-    id: int
+class _EventBase(BaseSchema):
     name: str
     description: str
     is_recurring: bool | None = None
@@ -122,41 +120,28 @@ class EventRead(BaseSchema):
     recurrence_start_date: date | None = None
     recurrence_end_date: date | None = None
     recurrence_rule: dict[str, list[str]] = {}
-    occurrences: list[EventOccurrenceRead] = []
 
+    def to_dict(self):
+        return msgspec.structs.asdict(self)
 
-class EventCreate(BaseSchema):
-    name: str
-    description: str
-    is_recurring: bool | None = None
-    single_start: datetime | None = None
-    single_end: datetime | None = None
-    recurrence_start_date: date | None = None
-    recurrence_end_date: date | None = None
-    recurrence_rule: dict[str, list[str]] = {}
+
+class EventRead(_EventBase, kw_only=True):
+    id: int
     occurrences: list[EventOccurrenceRead] = []
 
-    def to_dict(self):
-        return {f: getattr(self, f) for f in self.__struct_fields__}
 
+class EventCreate(_EventBase):
+    pass
 
-class EventUpdate(BaseSchema):
-    name: str
-    description: str
-    is_recurring: bool | None = None
-    single_start: datetime | None = None
-    single_end: datetime | None = None
-    recurrence_start_date: date | None = None
-    recurrence_end_date: date | None = None
-    recurrence_rule: dict[str, list[str]] = {}
-    occurrences: list[EventOccurrenceRead] = []
+
+class EventUpdate(_EventBase):
+    pass
 
 
 # ################################################
 # -- Participant
 
-class ParticipantRead(BaseSchema):
-    id: int
+class _ParticipantBase(BaseSchema):
     full_name: str
     birth_date: date
     phone: str | None = None
@@ -164,17 +149,13 @@ class ParticipantRead(BaseSchema):
     guardian_id: int | None = None
 
 
-class ParticipantCreate(BaseSchema):
-    full_name: str
-    birth_date: date
-    phone: str | None = None
-    observations: str | None = None
-    guardian_id: int | None = None
+class ParticipantRead(_ParticipantBase, kw_only=True):
+    id: int
 
 
-class ParticipantUpdate(BaseSchema):
-    full_name: str
-    birth_date: date
-    phone: str | None = None
-    observations: str | None = None
-    guardian_id: int | None = None
\ No newline at end of file
+class ParticipantCreate(_ParticipantBase):
+    pass
+
+
+class ParticipantUpdate(_ParticipantBase):
+    pass
\ No newline at end of file
@@ -1,5 +1,8 @@
+from datetime import datetime
 from advanced_alchemy.extensions.litestar import repository, service
 from models import AttendanceModel
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert
 
 
 class AttendanceService(service.SQLAlchemyAsyncRepositoryService[AttendanceModel]):
@@ -14,4 +17,68 @@ class AttendanceService(service.SQLAlchemyAsyncRepositoryService[AttendanceModel
         return await self.repository.get_one_or_none(
             occurrence_id=occurrence_id,
             participant_id=participant_id
-        )
\ No newline at end of file
+        )
+
+    async def list_by_occurrence_and_participants(
+        self, occurrence_id: int, participant_ids: list[int]
+    ) -> dict[int, AttendanceModel]:
+        """Get attendance records of an occurrence for several participants, keyed by participant id."""
+        if not participant_ids:
+            return {}
+        stmt = select(AttendanceModel).where(
+            AttendanceModel.occurrence_id == occurrence_id,
+            AttendanceModel.participant_id.in_(participant_ids),
+        )
+        result = await self.repository.session.scalars(stmt)
+        return {attendance.participant_id: attendance for attendance in result}
+
+    async def checkin_atomic(
+        self,
+        occurrence_id: int,
+        participant_id: int,
+        checkin_at: datetime,
+        code_hash: bytes | None,
+    ) -> AttendanceModel | None:
+        """Check in with a single INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+        Returns None when the participant already checked in to this occurrence.
+        """
+        stmt = (
+            insert(AttendanceModel)
+            .values(
+                occurrence_id=occurrence_id,
+                participant_id=participant_id,
+                checkin_at=checkin_at,
+                code_hash=code_hash,
+            )
+            .on_conflict_do_nothing(index_elements=[AttendanceModel.occurrence_id, AttendanceModel.participant_id])
+            .returning(AttendanceModel)
+        )
+        return (await self.repository.session.execute(stmt)).scalar_one_or_none()
+
+    async def checkout_atomic(
+        self,
+        occurrence_id: int,
+        participant_id: int,
+        checkout_by_participant_id: int,
+        expected_code_hashes: tuple[bytes, ...] | None,
+    ) -> AttendanceModel | None:
+        """Check out with a single UPDATE ... RETURNING.
+
+        Only matches an attendance that is checked in, not yet checked out and, when
+        ``expected_code_hashes`` is given, carries one of those hashes (the HMAC, or the
+        plain SHA-256 kept from check-ins made before the HMAC migration). Returns None otherwise.
+        """
+        stmt = (
+            update(AttendanceModel)
+            .where(
+                AttendanceModel.occurrence_id == occurrence_id,
+                AttendanceModel.participant_id == participant_id,
+                AttendanceModel.checkout_at.is_(None),
+            )
+            .values(checkout_at=func.now(), checkout_by_participant_id=checkout_by_participant_id)
+            .returning(AttendanceModel)
+        )
+        if expected_code_hashes is not None:
+            stmt = stmt.where(AttendanceModel.code_hash.in_(expected_code_hashes))
+        return (await self.repository.session.execute(stmt)).scalar_one_or_none()
\ No newline at end of file
@@ -1,12 +1,18 @@
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, time
+from typing import Any
 from zoneinfo import ZoneInfo
 from advanced_alchemy.extensions.litestar import repository, service
 from models import EventModel, EventOccurrenceModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, insert, delete, func
 from config import settings
 
 
+# Fusos usados na geração de ocorrências (horários locais gravados em UTC)
+_TZ_LOCAL = ZoneInfo(settings.timezone)
+_TZ_UTC = ZoneInfo("UTC")
+
+
 class EventService(service.SQLAlchemyAsyncRepositoryService[EventModel]):
     """Event service."""
     class Repo(repository.SQLAlchemyAsyncRepository[EventModel]):
@@ -14,47 +20,60 @@ class EventService(service.SQLAlchemyAsyncRepositoryService[EventModel]):
         model_type = EventModel
     repository_type = Repo
 
+    async def fingerprint(self) -> tuple[datetime | None, int]:
+        """Get (max updated_at, count) of events, used to build the index ETag."""
+        stmt = select(func.max(EventModel.updated_at), func.count()).select_from(EventModel)
+        last_update, total = (await self.repository.session.execute(stmt)).one()
+        return last_update, total
+
     async def generate_occurrences(self, event: EventModel, session: AsyncSession) -> list[EventOccurrenceModel]:
         """
         Generate EventOccurrence records from an EventModel.
         
         For single events: creates 1 occurrence
         For recurring events: creates multiple occurrences based on recurrence_rule
+        Existing occurrences that still match are kept; the others are deleted
         
         Args:
             event: The EventModel to generate occurrences for
             session: SQLAlchemy async session for database operations
             
         Returns:
-            List of created EventOccurrenceModel instances
+            List of newly created EventOccurrenceModel instances
         """
-        occurrences = []
-        
-        # Delete existing occurrences for this event
-        stmt = delete(EventOccurrenceModel).where(EventOccurrenceModel.event_id == event.id)
-        await session.execute(stmt)
-        
         if event.is_recurring:
             # Generate occurrences for recurring events
-            occurrences = await self._generate_recurring_occurrences(event, session)
-        else:
+            rows = self._recurring_occurrence_rows(event)
+        elif event.single_start and event.single_end:
             # Generate single occurrence for one-off events
-            if event.single_start and event.single_end:
-                occurrence = EventOccurrenceModel(
-                    event_id=event.id,
-                    start_at=event.single_start,
-                    end_at=event.single_end
-                )
-                session.add(occurrence)
-                occurrences.append(occurrence)
+            rows = [{"event_id": event.id, "start_at": event.single_start, "end_at": event.single_end}]
+        else:
+            rows = []
         
-        await session.flush()
-        return occurrences
+        # Diff against the existing occurrences: unchanged ones (and their attendances) are kept
+        target = {(row["start_at"], row["end_at"]): row for row in rows}
+        stmt = select(EventOccurrenceModel.id, EventOccurrenceModel.start_at, EventOccurrenceModel.end_at).where(
+            EventOccurrenceModel.event_id == event.id
+        )
+        obsolete_ids = []
+        for occurrence_id, start_at, end_at in await session.execute(stmt):
+            if target.pop((start_at, end_at), None) is None:
+                obsolete_ids.append(occurrence_id)
+        
+        if obsolete_ids:
+            await session.execute(delete(EventOccurrenceModel).where(EventOccurrenceModel.id.in_(obsolete_ids)))
+        
+        if not target:
+            return []
+        
+        # One bulk INSERT ... RETURNING instead of a unit-of-work entry per occurrence
+        result = await session.scalars(insert(EventOccurrenceModel).returning(EventOccurrenceModel), list(target.values()))
+        return list(result)
     
 
-    async def _generate_recurring_occurrences(self, event: EventModel, session: AsyncSession) -> list[EventOccurrenceModel]:
+    def _recurring_occurrence_rows(self, event: EventModel) -> list[dict[str, Any]]:
         """
-        Generate occurrences for a recurring event based on recurrence_rule.
+        Build the occurrence rows (event_id, start_at, end_at) for a recurring event based on recurrence_rule.
         
         Recurrence rule format:
         {
@@ -76,48 +95,37 @@ class EventService(service.SQLAlchemyAsyncRepositoryService[EventModel]):
         
         # Convert weekday strings to integers
         try:
-            weekdays = [int(day) for day in weekdays]
+            weekdays = frozenset(int(day) for day in weekdays)
         except (ValueError, TypeError):
             return occurrences
         
-        # Generate occurrences for each date in the recurrence period
-        current_date = event.recurrence_start_date
-        end_date = event.recurrence_end_date
+        # Parse each "HH:MM-HH:MM" window once, skipping malformed ones
+        windows = []
+        for time_window in time_windows:
+            try:
+                start_time_str, end_time_str = time_window.split("-")
+                start_hour, start_min = map(int, start_time_str.strip().split(":"))
+                end_hour, end_min = map(int, end_time_str.strip().split(":"))
+                windows.append((time(start_hour, start_min), time(end_hour, end_min)))
+            except (ValueError, IndexError):
+                continue
         
-        while current_date <= end_date:
-            # Check if current day of week is in the recurrence rule
-            if current_date.weekday() in weekdays:
-                # Create an occurrence for each time window
-                for time_window in time_windows:
-                    try:
-                        start_time_str, end_time_str = time_window.split("-")
-                        start_hour, start_min = map(int, start_time_str.strip().split(":"))
-                        end_hour, end_min = map(int, end_time_str.strip().split(":"))
-                        
-                        # Create datetime objects in local timezone and convert to UTC
-                        local_start_dt = datetime.combine(current_date, datetime.min.time()).replace(
-                            hour=start_hour, minute=start_min, tzinfo=ZoneInfo(settings.timezone)
-                        )
-                        local_end_dt = datetime.combine(current_date, datetime.min.time()).replace(
-                            hour=end_hour, minute=end_min, tzinfo=ZoneInfo(settings.timezone)
-                        )
-
-                        # Convert to UTC for storage
-                        start_dt = local_start_dt.astimezone(ZoneInfo("UTC"))
-                        end_dt = local_end_dt.astimezone(ZoneInfo("UTC"))
-                        
-                        occurrence = EventOccurrenceModel(
-                            event_id=event.id,
-                            start_at=start_dt,
-                            end_at=end_dt
-                        )
-                        session.add(occurrence)
-                        occurrences.append(occurrence)
-                    except (ValueError, IndexError):
-                        # Skip malformed time windows
-                        continue
-            
-            # Move to next day
-            current_date += timedelta(days=1)
+        start_date = event.recurrence_start_date
+        span = (event.recurrence_end_date - start_date).days
+        # Offsets (0-6) of the rule's weekdays from the start date: only matching days are visited
+        day_offsets = sorted((day - start_date.weekday()) % 7 for day in weekdays if 0 <= day <= 6)
+        
+        # Generate occurrences week by week over the recurrence period, in chronological order
+        for offset in (week + day for week in range(0, span + 1, 7) for day in day_offsets):
+            if offset > span:
+                break
+            current_date = start_date + timedelta(days=offset)
+            # Create an occurrence for each time window
+            for start_time, end_time in windows:
+                # Create datetime objects in local timezone and convert to UTC for storage
+                start_dt = datetime.combine(current_date, start_time, tzinfo=_TZ_LOCAL).astimezone(_TZ_UTC)
+                end_dt = datetime.combine(current_date, end_time, tzinfo=_TZ_LOCAL).astimezone(_TZ_UTC)
+                
+                occurrences.append({"event_id": event.id, "start_at": start_dt, "end_at": end_dt})
         
         return occurrences
@@ -1,5 +1,44 @@
-from advanced_alchemy.extensions.litestar import repository, service
-from models import ParticipantModel
+import time
+from datetime import date
+from functools import lru_cache
+from typing import Sequence
+
+import msgspec
+from advanced_alchemy.extensions.litestar import filters, repository, service
+from sqlalchemy import Row, or_, select
+from models import ADULT_AGE, ParticipantModel
+from schemas import ParticipantRead
+
+
+# Tamanho da página da listagem de participantes
+PAGE_SIZE = 20
+
+
+# Cache em processo da lista completa de participantes (selects de check-in/check-out).
+# Guarda structs, não objetos ORM: estes ficam presos à sessão que os carregou e expiram no rollback
+_PARTICIPANTS_TTL = 30.0
+_PARTICIPANT_READ_LIST = list[ParticipantRead]
+_participants_cache: tuple[float, Sequence[ParticipantRead]] | None = None
+# Lista de adultos (responsáveis) dos formulários, por data de corte; mesma TTL e invalidação.
+# Só as colunas do <select> (id, nome, telefone), em linhas simples desligadas da sessão
+_guardians_cache: tuple[float, date, Sequence[Row[tuple[int, str, str | None]]]] | None = None
+
+
+@lru_cache(maxsize=8)
+def adult_cutoff(today: date) -> date:
+    """Latest birth date of a participant who is an adult on ``today``."""
+    try:
+        return today.replace(year=today.year - ADULT_AGE)
+    except ValueError:
+        # 29/02: no ano de nascimento correspondente a data não existe
+        return today.replace(year=today.year - ADULT_AGE, day=28)
+
+
+def invalidate_participants_cache() -> None:
+    """Drop the cached participant lists; call after a participant is created, updated or deleted."""
+    global _participants_cache, _guardians_cache
+    _participants_cache = None
+    _guardians_cache = None
 
 
 class ParticipantService(service.SQLAlchemyAsyncRepositoryService[ParticipantModel]):
@@ -7,4 +46,57 @@ class ParticipantService(service.SQLAlchemyAsyncRepositoryService[ParticipantMod
     class Repo(repository.SQLAlchemyAsyncRepository[ParticipantModel]):
         """Participant repository."""
         model_type = ParticipantModel
-    repository_type = Repo
\ No newline at end of file
+    repository_type = Repo
+
+    async def list_cached(self) -> Sequence[ParticipantRead]:
+        """List all participants as plain structs, reusing the in-process cache for up to _PARTICIPANTS_TTL seconds."""
+        global _participants_cache
+        now = time.monotonic()
+        if _participants_cache is not None and now - _participants_cache[0] < _PARTICIPANTS_TTL:
+            return _participants_cache[1]
+        participants = msgspec.convert(await self.list(), type=_PARTICIPANT_READ_LIST, from_attributes=True)
+        _participants_cache = (now, participants)
+        return participants
+
+    async def list_page(
+        self, *filters_: filters.FilterTypes, after_id: int | None = None, limit: int = PAGE_SIZE
+    ) -> Sequence[ParticipantModel]:
+        """List up to ``limit`` participants ordered by id, after ``after_id`` (keyset pagination)."""
+        keyset = [ParticipantModel.id > after_id] if after_id is not None else []
+        return await self.list(
+            *filters_,
+            *keyset,
+            filters.OrderBy(field_name="id", sort_order="asc"),
+            filters.LimitOffset(limit=limit, offset=0),
+        )
+
+    async def list_guardians(
+        self, today: date, exclude_id: int | None = None
+    ) -> Sequence[Row[tuple[int, str, str | None]]]:
+        """List (id, full_name, phone) of adult participants (possible guardians), optionally excluding one (cached)."""
+        global _guardians_cache
+        now = time.monotonic()
+        cutoff = adult_cutoff(today)
+        if _guardians_cache is None or _guardians_cache[1] != cutoff or now - _guardians_cache[0] >= _PARTICIPANTS_TTL:
+            stmt = (
+                select(ParticipantModel.id, ParticipantModel.full_name, ParticipantModel.phone)
+                .where(ParticipantModel.birth_date <= cutoff)
+                .order_by(ParticipantModel.full_name)
+            )
+            guardians = (await self.repository.session.execute(stmt)).all()
+            _guardians_cache = (now, cutoff, guardians)
+        guardians = _guardians_cache[2]
+        if exclude_id is None:
+            return guardians
+        return [g for g in guardians if g.id != exclude_id]
+
+    async def search(self, search: str, limit: int = 50) -> Sequence[ParticipantModel]:
+        """Search participants by name (case-insensitive) or last 4 phone digits."""
+        return await self.list(
+            or_(
+                ParticipantModel.full_name.icontains(search, autoescape=True),
+                ParticipantModel.phone_last4.contains(search, autoescape=True),
+            ),
+            filters.OrderBy(field_name="full_name", sort_order="asc"),
+            filters.LimitOffset(limit=limit, offset=0),
+        )
\ No newline at end of file
@@ -1,4 +1,7 @@
+from typing import Any, Sequence
+
 from advanced_alchemy.extensions.litestar import repository, service
+from sqlalchemy import Row, select, update, or_, func
 from models import RegistrationRequestModel
 
 
@@ -7,4 +10,39 @@ class RegistrationService(service.SQLAlchemyAsyncRepositoryService[RegistrationR
     class Repo(repository.SQLAlchemyAsyncRepository[RegistrationRequestModel]):
         """Registration request repository."""
         model_type = RegistrationRequestModel
-    repository_type = Repo
\ No newline at end of file
+    repository_type = Repo
+
+    async def find_pending(self, username: str, email: str) -> Sequence[Row[Any]]:
+        """Get (username, email) of pending requests that match the given username or email."""
+        stmt = select(RegistrationRequestModel.username, RegistrationRequestModel.email).where(
+            RegistrationRequestModel.status == "pending",
+            or_(RegistrationRequestModel.username == username, RegistrationRequestModel.email == email),
+        )
+        return (await self.repository.session.execute(stmt)).all()
+
+    async def mark_reviewed(
+        self, request_id: int, status: str, reviewer_id: int | None, rejection_reason: str | None = None
+    ) -> str | None:
+        """Set the review status of a pending request in one UPDATE; return its username, or None if not pending."""
+        stmt = (
+            update(RegistrationRequestModel)
+            .where(RegistrationRequestModel.id == request_id, RegistrationRequestModel.status == "pending")
+            .values(
+                status=status,
+                reviewed_at=func.now(),
+                reviewed_by_user_id=reviewer_id,
+                rejection_reason=rejection_reason,
+            )
+            .returning(RegistrationRequestModel.username)
+        )
+        return (await self.repository.session.execute(stmt)).scalar_one_or_none()
+
+    async def update_pending(self, request_id: int, **values: Any) -> RegistrationRequestModel | None:
+        """Update a pending request in one UPDATE ... RETURNING; None if it does not exist or is not pending."""
+        stmt = (
+            update(RegistrationRequestModel)
+            .where(RegistrationRequestModel.id == request_id, RegistrationRequestModel.status == "pending")
+            .values(**values)
+            .returning(RegistrationRequestModel)
+        )
+        return (await self.repository.session.scalars(stmt)).one_or_none()
\ No newline at end of file
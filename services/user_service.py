@@ -1,4 +1,7 @@
+from typing import Any, Sequence
+
 from advanced_alchemy.extensions.litestar import repository, service
+from sqlalchemy import Row, select, insert, or_
 from models import UserModel
 
 
@@ -7,4 +10,20 @@ class UserService(service.SQLAlchemyAsyncRepositoryService[UserModel]):
     class Repo(repository.SQLAlchemyAsyncRepository[UserModel]):
         """Author repository."""
         model_type = UserModel
-    repository_type = Repo
\ No newline at end of file
+    repository_type = Repo
+
+    async def find_existing(self, username: str, email: str) -> Sequence[Row[Any]]:
+        """Get (username, email) of users that match the given username or email."""
+        stmt = select(UserModel.username, UserModel.email).where(
+            or_(UserModel.username == username, UserModel.email == email)
+        )
+        return (await self.repository.session.execute(stmt)).all()
+
+    async def create_active(self, username: str, email: str, password_hash: str, profile: str | None) -> int:
+        """Insert an active user in one statement and return its id."""
+        stmt = (
+            insert(UserModel)
+            .values(username=username, email=email, password_hash=password_hash, profile=profile, is_active=True)
+            .returning(UserModel.id)
+        )
+        return (await self.repository.session.execute(stmt)).scalar_one()
\ No newline at end of file